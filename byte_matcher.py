@@ -0,0 +1,156 @@
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from keyword_matcher import select_backend
+
+# Кодировки, в которых ищутся ключевые слова в сырых байтах
+CANDIDATE_ENCODINGS = ('utf-8', 'cp1251', 'utf-16-le')
+
+# Размер начала файла, по которому определяются вероятные кодировки
+PROBE_SIZE = 64 * 1024
+
+# Сколько байтов вокруг совпадения декодируется при проверке
+VERIFY_WINDOW = 8
+
+
+def _cp1251_lower_table() -> bytes:
+    """Таблица bytes.translate: байт буквы в cp1251 -> байт той же буквы в нижнем регистре"""
+    table = bytearray(range(256))
+    for byte in range(256):
+        try:
+            lowered = bytes([byte]).decode('cp1251').lower().encode('cp1251')
+        except (UnicodeDecodeError, UnicodeEncodeError):
+            continue
+        if len(lowered) == 1:
+            table[byte] = lowered[0]
+    return bytes(table)
+
+
+CP1251_LOWER = _cp1251_lower_table()
+
+
+def lower_bytes(data: bytes, encoding: str, offset: int = 0) -> bytes:
+    """Байты текста в нижнем регистре - как text.lower(), но без декодирования всего файла в строку.
+
+    cp1251 и ASCII приводятся таблицей по байтам. UTF-8 с не-ASCII символами
+    и UTF-16 декодируются только в пределах буфера; незаконченный символ на
+    границе буфера остаётся как есть (errors='surrogateescape' / 'surrogatepass')
+    и приводится в следующем буфере, куда попадает с перекрытием. offset -
+    смещение буфера от начала файла: UTF-16 декодируется с чётной позиции.
+    Длина в байтах сохраняется для всех букв, кроме редких вроде "İ" и знака
+    кельвина - у них смещения мест совпадений после такой буквы сдвигаются.
+    """
+    if encoding == 'cp1251':
+        return data.translate(CP1251_LOWER)
+    if encoding == 'utf-8':
+        if data.isascii():
+            return data.lower()
+        return data.decode('utf-8', errors='surrogateescape').lower().encode('utf-8', errors='surrogateescape')
+    # UTF-16LE: выравнивание по позиции в файле, нечётный последний байт - без изменений
+    head = offset % 2
+    end = head + (len(data) - head) // 2 * 2
+    body = data[head:end].decode('utf-16-le', errors='surrogatepass').lower()
+    return data[:head] + body.encode('utf-16-le', errors='surrogatepass') + data[end:]
+
+
+def detect_encodings(head: bytes) -> Tuple[str, ...]:
+    """Вероятные кодировки файла по его началу.
+
+    Проба отсекает заведомо неподходящие кодировки, чтобы не искать по буферу
+    лишний раз и не получать ложных совпадений cp1251 в UTF-8 тексте.
+    """
+    # BOM не решает сам по себе: "яю" в начале cp1251 текста даёт те же байты
+    body = head[2:] if head.startswith(b'\xff\xfe') else head
+    high_bytes = body[1::2]
+    if high_bytes and (high_bytes.count(0) + high_bytes.count(4)) * 10 > len(high_bytes) * 6:
+        # Старшие байты латиницы и кириллицы в UTF-16LE - 0x00 и 0x04
+        return ('utf-16-le',)
+    try:
+        head.decode('utf-8', errors='strict')
+        is_utf8 = True
+    except UnicodeDecodeError as e:
+        # Последний символ пробы мог оказаться разрезан - допускаем неполный хвост
+        is_utf8 = e.start >= len(head) - 3 and e.reason == 'unexpected end of data'
+    if is_utf8 and not head.isascii():
+        return ('utf-8',)
+    return ('utf-8', 'cp1251')
+
+
+def text_encoding(head: bytes) -> str:
+    """Одна кодировка для декодирования файла, когда без декодирования не обойтись"""
+    encodings = detect_encodings(head)
+    if len(encodings) == 1:
+        return encodings[0]
+    # Проба только из ASCII ничего не говорит о кириллице - считаем файл UTF-8
+    return 'utf-8' if head.isascii() else 'cp1251'
+
+
+class ByteMatcher:
+    """Поиск ключевых слов в недекодированных байтах.
+
+    Каждое слово (уже в нижнем регистре) кодируется во всех кандидатных
+    кодировках, и полученные последовательности байтов ищутся тем же
+    многошаблонным алгоритмом, что и текст - в буфере, приведённом к нижнему
+    регистру для каждой кодировки (lower_bytes). Поэтому слово находится в
+    любом регистре, как при поиске в text.lower(). Проверка совпадения идёт
+    по исходным байтам.
+    """
+
+    def __init__(self, keywords: Iterable[str], backend: str = 'auto'):
+        self._backends = {}
+        self._labels: Dict[str, Dict[bytes, str]] = {}
+        for encoding in CANDIDATE_ENCODINGS:
+            labels = {}
+            for keyword in sorted(set(keywords)):
+                if encoding == 'cp1251' and keyword.isascii():
+                    # ASCII-слова в cp1251 совпадают с UTF-8 и уже ищутся там
+                    continue
+                try:
+                    labels.setdefault(keyword.encode(encoding), keyword)
+                except UnicodeEncodeError:
+                    continue
+            if labels:
+                self._labels[encoding] = labels
+                self._backends[encoding] = select_backend(labels, backend)
+
+        # Длина самого длинного слова в байтах - столько нужно перекрытия между блоками потока
+        self.max_needle_length = max((len(needle) for labels in self._labels.values() for needle in labels),
+                                     default=0)
+
+    @staticmethod
+    def _verify(data: bytes, start: int, needle: bytes, encoding: str, offset: int) -> bool:
+        """Проверка совпадения, которое могло оказаться случайным набором байтов"""
+        if encoding == 'utf-16-le':
+            return (offset + start) % 2 == 0
+        if encoding == 'cp1251':
+            # Короткие кириллические слова в cp1251 встречаются внутри UTF-8 текста
+            window = data[max(0, start - VERIFY_WINDOW):start + len(needle) + VERIFY_WINDOW]
+            try:
+                return window.decode('utf-8').isascii()
+            except UnicodeDecodeError:
+                return True
+        return True
+
+    def iter_matches(self, data: bytes, encodings: Iterable[str] = CANDIDATE_ENCODINGS,
+                     offset: int = 0) -> Iterator[Tuple[int, int, str, str]]:
+        """Четвёрки (начало, конец в байтах, ключевое слово, кодировка) для проверенных совпадений.
+
+        offset - смещение буфера от начала файла, нужно для проверки
+        выравнивания UTF-16.
+        """
+        for encoding in encodings:
+            backend = self._backends.get(encoding)
+            if backend is None:
+                continue
+            labels = self._labels[encoding]
+            for start, needle in backend.iter_matches(lower_bytes(data, encoding, offset)):
+                if self._verify(data, start, needle, encoding, offset):
+                    yield start, start + len(needle), labels[needle], encoding
+
+    def count(self, data: bytes, encodings: Iterable[str] = CANDIDATE_ENCODINGS, offset: int = 0,
+              skip: int = 0) -> Counter:
+        """Число проверенных вхождений каждого слова; совпадения, кончающиеся в первых skip байтах, не считаются"""
+        return Counter(kw for _, end, kw, _ in self.iter_matches(data, encodings, offset) if end > skip)
+
+    def first(self, data: bytes, encodings: Iterable[str] = CANDIDATE_ENCODINGS, offset: int = 0) -> Optional[str]:
+        return next((kw for _, _, kw, _ in self.iter_matches(data, encodings, offset)), None)
@@ -1,6 +1,8 @@
 import os
 import configparser
 
+from file_discovery import parse_date
+
 def load_config(config_file="config.txt"):
     """Загрузка конфигурации из файла"""
     config = configparser.ConfigParser()
@@ -16,7 +18,32 @@ def load_config(config_file="config.txt"):
         'max_file_size': '50',
         'log_file': 'search_log.txt',
         'tesseract_languages': 'rus',
-        'tesseract_config': '--oem 3 --psm 6'
+        'tesseract_config': '--oem 3 --psm 6',
+        'matcher_backend': 'auto',
+        'scan_mode': 'full',
+        'stream_chunk_size': '4',
+        'collect_locations': 'false',
+        'sort_results': 'false',
+        'top_results': '0',
+        'match_mode': 'substring',
+        'fuzzy_distance': '1',
+        'fuzzy_sources': 'ocr',
+        'text_folding': 'false',
+        'watch_keywords': 'false',
+        'text_cache_mb': '256',
+        'matcher_cache_dir': 'auto',
+        'walk_threads': '4',
+        'ordered_discovery': 'false',
+        'exclude_globs': '',
+        'exclude_paths': '',
+        'skip_hidden': 'false',
+        'max_depth': '0',
+        'min_file_size_kb': '0',
+        'size_limits': '',
+        'modified_after': '',
+        'modified_before': '',
+        'max_age_days': '0',
+        'sniff_content': 'true'
     }
 
     # Если файл конфигурации существует, загружаем его
@@ -38,13 +65,49 @@ def load_config(config_file="config.txt"):
     log_file = config.get('Settings', 'log_file', fallback=defaults['log_file'])
     tesseract_languages = config.get('Settings', 'tesseract_languages', fallback=defaults['tesseract_languages'])
     tesseract_config = config.get('Settings', 'tesseract_config', fallback=defaults['tesseract_config'])
+    matcher_backend = config.get('Settings', 'matcher_backend', fallback=defaults['matcher_backend'])
+    scan_mode = config.get('Settings', 'scan_mode', fallback=defaults['scan_mode'])
+    stream_chunk_size = config.getint('Settings', 'stream_chunk_size', fallback=int(defaults['stream_chunk_size']))
+    collect_locations = config.getboolean('Settings', 'collect_locations', fallback=False)
+    sort_results = config.getboolean('Settings', 'sort_results', fallback=False)
+    top_results = config.getint('Settings', 'top_results', fallback=int(defaults['top_results']))
+    match_mode = config.get('Settings', 'match_mode', fallback=defaults['match_mode'])
+    fuzzy_distance = config.getint('Settings', 'fuzzy_distance', fallback=int(defaults['fuzzy_distance']))
+    fuzzy_sources = config.get('Settings', 'fuzzy_sources', fallback=defaults['fuzzy_sources']).split(',')
+    text_folding = config.getboolean('Settings', 'text_folding', fallback=False)
+    watch_keywords = config.getboolean('Settings', 'watch_keywords', fallback=False)
+    text_cache_mb = config.getint('Settings', 'text_cache_mb', fallback=int(defaults['text_cache_mb']))
+    matcher_cache_dir = config.get('Settings', 'matcher_cache_dir', fallback=defaults['matcher_cache_dir']).strip()
+    walk_threads = config.getint('Settings', 'walk_threads', fallback=int(defaults['walk_threads']))
+    ordered_discovery = config.getboolean('Settings', 'ordered_discovery', fallback=False)
+    exclude_globs = config.get('Settings', 'exclude_globs', fallback=defaults['exclude_globs']).split(',')
+    exclude_paths = config.get('Settings', 'exclude_paths', fallback=defaults['exclude_paths']).split(',')
+    skip_hidden = config.getboolean('Settings', 'skip_hidden', fallback=False)
+    max_depth = config.getint('Settings', 'max_depth', fallback=int(defaults['max_depth']))
+    min_file_size_kb = config.getint('Settings', 'min_file_size_kb', fallback=int(defaults['min_file_size_kb']))
+    size_limits = config.get('Settings', 'size_limits', fallback=defaults['size_limits']).split(',')
+    modified_after = config.get('Settings', 'modified_after', fallback=defaults['modified_after']).strip()
+    modified_before = config.get('Settings', 'modified_before', fallback=defaults['modified_before']).strip()
+    max_age_days = config.get('Settings', 'max_age_days', fallback=defaults['max_age_days'])
+    sniff_content = config.getboolean('Settings', 'sniff_content', fallback=True)
 
     # Очищаем значения от пробелов
     extensions = [ext.strip() for ext in extensions]
+    exclude_globs = [glob.strip() for glob in exclude_globs if glob.strip()]
+    exclude_paths = [path.strip() for path in exclude_paths if path.strip()]
+    # Неверный фильтр не останавливает поиск: сообщаем и берём значение по умолчанию
+    size_limits = checked_value('size_limits', size_limits, parse_size_limits, {})
+    modified_after = checked_value('modified_after', modified_after, checked_date, defaults['modified_after'])
+    modified_before = checked_value('modified_before', modified_before, checked_date, defaults['modified_before'])
+    max_age_days = checked_value('max_age_days', max_age_days, int, int(defaults['max_age_days']))
     keywords_file = keywords_file.strip()
     directory = directory.strip()
     output_file = output_file.strip()
     log_file = log_file.strip()
+    matcher_backend = matcher_backend.strip().lower()
+    scan_mode = scan_mode.strip().lower()
+    match_mode = match_mode.strip().lower()
+    fuzzy_sources = [source.strip().lower() for source in fuzzy_sources if source.strip()]
 
     # Если поиск по изображениям отключен, убираем изображения из расширений
     if not search_images:
@@ -61,9 +124,64 @@ def load_config(config_file="config.txt"):
         'max_file_size': max_file_size,
         'log_file': log_file,
         'tesseract_languages': tesseract_languages,
-        'tesseract_config': tesseract_config
+        'tesseract_config': tesseract_config,
+        'matcher_backend': matcher_backend,
+        'scan_mode': scan_mode,
+        'stream_chunk_size': stream_chunk_size,
+        'collect_locations': collect_locations,
+        'sort_results': sort_results,
+        'top_results': top_results,
+        'match_mode': match_mode,
+        'fuzzy_distance': fuzzy_distance,
+        'fuzzy_sources': fuzzy_sources,
+        'text_folding': text_folding,
+        'watch_keywords': watch_keywords,
+        'text_cache_mb': text_cache_mb,
+        'matcher_cache_dir': matcher_cache_dir,
+        'walk_threads': walk_threads,
+        'ordered_discovery': ordered_discovery,
+        'exclude_globs': exclude_globs,
+        'exclude_paths': exclude_paths,
+        'skip_hidden': skip_hidden,
+        'max_depth': max_depth,
+        'min_file_size_kb': min_file_size_kb,
+        'size_limits': size_limits,
+        'modified_after': modified_after,
+        'modified_before': modified_before,
+        'max_age_days': max_age_days,
+        'sniff_content': sniff_content
     }
 
+def checked_value(key, value, parse, default):
+    """Значение параметра после разбора parse или default, если значение неверное"""
+    try:
+        return parse(value)
+    except ValueError as e:
+        # Журнал ещё не настроен: его файл тоже берётся из конфигурации
+        print(f"Неверное значение {key} в конфигурационном файле, используется значение по умолчанию: {e}")
+        return default
+
+def checked_date(value):
+    """Строка даты без изменений; ValueError, если дату не разобрать"""
+    parse_date(value)
+    return value
+
+def parse_size_limits(items):
+    """Лимиты размера по расширениям из строк вида ".txt:500" -> {'.txt': 500}"""
+    limits = {}
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        ext, sep, limit = item.rpartition(':')
+        ext = ext.strip().lstrip('*').lower()
+        if not sep or not ext or not limit.strip().isdigit():
+            raise ValueError(f"Неверный лимит размера '{item}', ожидается вида .txt:500")
+        if not ext.startswith('.'):
+            ext = '.' + ext
+        limits[ext] = int(limit)
+    return limits
+
 def create_default_config():
     """Создание файла конфигурации по умолчанию"""
     config_content = """[Settings]
@@ -86,6 +204,7 @@ output_file = search_results.txt
 search_images = true
 
 # Максимальный размер обрабатываемого файла (МБ)
+# Не применяется к текстовым файлам - они читаются потоково блоками
 max_file_size = 50
 
 # Файл для логирования
@@ -94,6 +213,106 @@ log_file = search_log.txt
 # Настройки Tesseract OCR
 tesseract_languages = rus
 tesseract_config = --oem 3 --psm 6
+
+# Алгоритм поиска ключевых слов: auto, naive, regex, aho_corasick
+# auto выбирает алгоритм по количеству ключевых слов
+matcher_backend = auto
+
+# Режим сканирования файла: full - целиком, any - до первого совпадения,
+# all - пока не найдены все ключевые слова
+scan_mode = full
+
+# Размер блока при потоковом чтении текстовых файлов (МБ)
+stream_chunk_size = 4
+
+# Сохранять места совпадений (страница, лист и ячейка, строка, файл в архиве)
+# и фрагмент текста вокруг найденного слова
+collect_locations = false
+
+# Упорядочивать результаты по релевантности (число и плотность вхождений,
+# количество разных слов, слова в имени файла). Результаты тогда выводятся
+# только после обработки всех директорий, а не по мере нахождения
+sort_results = false
+
+# Сколько самых релевантных файлов выводить (0 - все)
+top_results = 0
+
+# Сравнение ключевых слов с текстом: substring - вхождение подстроки,
+# word - только целые слова, stem - по основам слов (одно слово в keywords.txt
+# находит все его формы). Для отдельного слова режим задаётся префиксом
+# в keywords.txt: sub:, word: или stem:. Префиксы re: и glob: задают регулярное
+# выражение или шаблон с * и ?, префикс query: - правило вида
+# query:контракт AND (поставка OR договор) NOT образец WITHIN 50 WORDS
+match_mode = substring
+
+# Нечёткий поиск с ошибками распознавания: максимум ошибок в слове (0 - выключен).
+# Слова короче 5 букв ищутся точно, длинные - не больше одной ошибки на 4 буквы
+fuzzy_distance = 1
+
+# Для какого текста включён нечёткий поиск (через запятую): ocr, pdf, docx, excel.
+# На всём тексте он заметно медленнее точного, поэтому по умолчанию - только для OCR
+fuzzy_sources = ocr
+
+# Приводить текст и ключевые слова к общему виду: регистр, ё и е, полноширинные
+# символы, латинские буквы вместо похожих русских (a, o, c, p...). Текстовые
+# файлы при этом декодируются, что заметно медленнее поиска по сырым байтам
+text_folding = false
+
+# Следить за keywords.txt во время поиска: изменённые слова применяются со
+# следующего файла, а уже обработанные файлы в конце проверяются на добавленные слова
+watch_keywords = false
+
+# Сколько МБ извлечённого текста (PDF, DOCX, OCR, Excel) хранить для такой проверки;
+# файлы сверх этого обрабатываются заново
+text_cache_mb = 256
+
+# Каталог, где сохраняется собранный набор ключевых слов: при следующем запуске
+# с теми же словами и параметрами он загружается, а не собирается заново.
+# auto - каталог в профиле пользователя (%LOCALAPPDATA% или ~/.cache),
+# пустое значение - не сохранять. Общий каталог указывать нельзя: файлы кэша
+# исполняются при загрузке, доступ к ним должен быть только у вас
+matcher_cache_dir = auto
+
+# Сколько потоков параллельно читают каталоги при поиске файлов (1 - один поток).
+# Ускоряет обход больших деревьев на сетевых дисках
+walk_threads = 4
+
+# Обходить файлы всегда в одном порядке (по именам) при любом числе потоков
+ordered_discovery = false
+
+# Не обходить каталоги и не проверять файлы с такими именами (маски через запятую),
+# например: .git, node_modules, $RECYCLE.BIN, System Volume Information, *.bak.
+# Маска с разделителем пути проверяется по полному пути
+exclude_globs =
+
+# Каталоги, которые не обходятся вместе со всем содержимым (полные пути через запятую)
+exclude_paths =
+
+# Пропускать скрытые файлы и каталоги (имя с точкой, в Windows - скрытые и системные)
+skip_hidden = false
+
+# Сколько уровней каталогов обходить, считая саму директорию поиска (0 - без ограничения)
+max_depth = 0
+
+# Не обрабатывать файлы меньше этого размера (КБ, 0 - без ограничения)
+min_file_size_kb = 0
+
+# Лимиты размера для отдельных расширений (МБ, через запятую), например: .txt:500, .log:100.
+# Заменяют max_file_size и действуют также на текстовые файлы
+size_limits =
+
+# Обрабатывать только файлы, изменённые начиная с этой даты и до этой даты
+# (ГГГГ-ММ-ДД или ДД.ММ.ГГГГ, пусто - без ограничения)
+modified_after =
+modified_before =
+
+# Обрабатывать только файлы, изменённые за последние N дней (0 - без ограничения)
+max_age_days = 0
+
+# Определять формат файла по содержимому, а не только по расширению: переименованные
+# PDF, DOCX, Excel и архивы обрабатываются по настоящему формату, а двоичные файлы
+# (программы, базы данных, видео) пропускаются, а не читаются как текст
+sniff_content = true
 """
 
     with open("config.txt", "w", encoding="utf-8") as f:
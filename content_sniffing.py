@@ -0,0 +1,102 @@
+import zipfile
+
+# Сколько байт с начала файла читается для определения формата
+SNIFF_BYTES = 8 * 1024
+
+# Доля нулевых байт в начале файла, начиная с которой файл считается двоичным
+BINARY_NUL_RATIO = 0.01
+
+# Сигнатуры в начале файла и форматы, которые они обозначают
+SIGNATURES = (
+    (b'%PDF-', 'pdf'),
+    (b'PK\x03\x04', 'zip'),
+    (b'PK\x05\x06', 'zip'),
+    (b'7z\xbc\xaf\x27\x1c', '7z'),
+    (b'Rar!\x1a\x07', 'rar'),
+    (b'\x89PNG\r\n\x1a\n', 'image'),
+    (b'\xff\xd8\xff', 'image'),
+    (b'II*\x00', 'image'),
+    (b'MM\x00*', 'image'),
+    (b'GIF87a', 'image'),
+    (b'GIF89a', 'image'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'ole'),
+    (b'\x7fELF', 'binary'),
+    (b'SQLite format 3\x00', 'binary'),
+)
+
+# Форматы по расширению имени файла - для файлов, содержимое которых не опознано
+EXTENSION_KINDS = {
+    '.png': 'image', '.jpg': 'image', '.jpeg': 'image', '.bmp': 'image', '.gif': 'image', '.tiff': 'image',
+    '.pdf': 'pdf', '.docx': 'docx', '.xls': 'xls', '.xlsx': 'xlsx', '.zip': 'zip', '.7z': '7z', '.rar': 'rar',
+}
+
+# Метки порядка байт: текст в UTF-16 и UTF-32 содержит много нулевых байт, но остаётся текстом
+TEXT_BOMS = (b'\xef\xbb\xbf', b'\xff\xfe', b'\xfe\xff')
+
+# Старшие байты символов латиницы и кириллицы в UTF-16 - 0x00 и 0x04
+UTF16_HIGH_BYTES = (0x00, 0x04)
+
+# Имя потока книги Excel в каталоге составного документа OLE (в UTF-16)
+OLE_WORKBOOK = 'Workbook'.encode('utf-16-le')
+
+
+def sniff(head: bytes) -> str:
+    """Формат по первым байтам файла.
+
+    pdf, zip, 7z, rar, image, ole (старые документы Office), binary - прочие
+    двоичные данные (по сигнатуре или доле нулевых байт) или text.
+    """
+    for signature, kind in SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    # PDF допускает мусор перед заголовком в пределах первого килобайта
+    if b'%PDF-' in head[:1024]:
+        return 'pdf'
+    if head.startswith(TEXT_BOMS) or _looks_like_utf16(head):
+        return 'text'
+    if head.count(b'\x00') > len(head) * BINARY_NUL_RATIO:
+        return 'binary'
+    return 'text'
+
+
+def _looks_like_utf16(head: bytes) -> bool:
+    """Текст в UTF-16 без метки порядка байт.
+
+    Нулевые байты в нём стоят почти только на одной чётности позиций - там,
+    где старшие байты символов; в двоичных данных они распределены по обеим.
+    """
+    for high, low in ((head[1::2], head[0::2]), (head[0::2], head[1::2])):
+        if (high and sum(map(high.count, UTF16_HIGH_BYTES)) * 10 > len(high) * 6
+                and low.count(0) <= len(low) * BINARY_NUL_RATIO):
+            return True
+    return False
+
+
+def sniff_file(path: str) -> str:
+    """Формат файла по содержимому.
+
+    Архивы ZIP дополнительно проверяются по списку файлов внутри: документ
+    Word (docx) и книга Excel (xlsx) - тоже ZIP. Составной документ OLE с
+    книгой внутри считается xls, остальные (doc, msg) - ole.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    kind = sniff(head)
+    if kind == 'zip':
+        return _zip_kind(path)
+    if kind == 'ole':
+        return 'xls' if OLE_WORKBOOK in head else 'ole'
+    return kind
+
+
+def _zip_kind(path: str) -> str:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+    except (zipfile.BadZipFile, OSError):
+        return 'binary'
+    if 'word/document.xml' in names:
+        return 'docx'
+    if 'xl/workbook.xml' in names:
+        return 'xlsx'
+    return 'zip'
@@ -0,0 +1,562 @@
+import fnmatch
+import logging
+import os
+import queue
+import re
+import stat
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+from content_sniffing import EXTENSION_KINDS
+
+# Форматы, которые разбираются только целиком и поэтому ограничены max_file_size.
+# Текстовые файлы читаются потоково и не ограничиваются по размеру.
+WHOLE_FILE_EXTENSIONS = tuple(EXTENSION_KINDS)
+
+# Сколько листингов каталогов параллельный обход держит готовыми, пока их не заберут
+WALK_QUEUE_SIZE = 64
+
+
+class ExtensionMatcher:
+    """Маски файлов из extensions, разобранные один раз.
+
+    Проверка matches(name) даёт тот же результат, что
+    any(fnmatch.fnmatch(name, mask) for mask in extensions), но маски вида
+    "*.ext" проверяются одним поиском окончания имени в множестве, а все
+    остальные - одним общим регулярным выражением. Итерация выдаёт исходные
+    маски, поэтому набор можно передавать везде, где ожидается список масок.
+    """
+
+    __slots__ = ('patterns', '_suffixes', '_regex')
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        suffixes, others = set(), []
+        for pattern in self.patterns:
+            # Регистр и разделители приводятся так же, как в fnmatch.fnmatch
+            pattern = os.path.normcase(pattern)
+            extension = pattern[1:]
+            if pattern.startswith('*.') and len(extension) > 1 and not re.search(r'[*?\[./\\]', extension[1:]):
+                suffixes.add(extension)
+            else:
+                others.append(fnmatch.translate(pattern))
+        self._suffixes: FrozenSet[str] = frozenset(suffixes)
+        self._regex: Optional[Pattern] = re.compile('|'.join(others)) if others else None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.patterns)
+
+    def __repr__(self) -> str:
+        return f"ExtensionMatcher({list(self.patterns)!r})"
+
+    def matches(self, name: str) -> bool:
+        """Подходит ли имя или путь файла хотя бы под одну маску"""
+        name = os.path.normcase(name)
+        if name[name.rfind('.'):] in self._suffixes:
+            return True
+        return self._regex is not None and self._regex.match(name) is not None
+
+
+@lru_cache(maxsize=8)
+def _compile_extensions(patterns: Tuple[str, ...]) -> ExtensionMatcher:
+    return ExtensionMatcher(patterns)
+
+
+def compile_extensions(extensions: Iterable[str]) -> ExtensionMatcher:
+    """Набор масок для проверки файлов; уже собранный набор возвращается как есть"""
+    if isinstance(extensions, ExtensionMatcher):
+        return extensions
+    return _compile_extensions(tuple(extensions))
+
+
+class WalkRules:
+    """Что пропускать при обходе каталогов.
+
+    exclude_globs - маски имён файлов и каталогов (node_modules, .git,
+    *.bak); маска с разделителем пути проверяется по полному пути.
+    exclude_paths - каталоги, которые не обходятся вместе со всем
+    содержимым. skip_hidden - пропускать скрытые файлы и каталоги (имя с
+    точкой, в Windows также атрибуты "скрытый" и "системный"). max_depth -
+    сколько уровней каталогов обходить, считая корень (0 - без ограничения).
+
+    Исключённый каталог не читается вовсе: правила проверяются по записи
+    родительского каталога, до листинга.
+    """
+
+    __slots__ = ('names', 'paths', 'prefixes', '_subpaths', 'skip_hidden', 'max_depth')
+
+    def __init__(self, exclude_globs: Iterable[str] = (), exclude_paths: Iterable[str] = (),
+                 skip_hidden: bool = False, max_depth: int = 0):
+        globs = [glob for glob in exclude_globs if glob]
+        name_globs = [glob for glob in globs if '/' not in glob and os.sep not in glob]
+        path_globs = [glob for glob in globs if glob not in name_globs]
+        self.names: Optional[ExtensionMatcher] = compile_extensions(name_globs) if name_globs else None
+        self.paths: Optional[ExtensionMatcher] = compile_extensions(path_globs) if path_globs else None
+        self.prefixes: Tuple[str, ...] = tuple(os.path.normcase(os.path.abspath(path)).rstrip(os.sep)
+                                               for path in exclude_paths if path)
+        self._subpaths = tuple(prefix + os.sep for prefix in self.prefixes)
+        self.skip_hidden = skip_hidden
+        self.max_depth = max(max_depth, 0)
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'WalkRules':
+        return cls(config.get('exclude_globs', ()), config.get('exclude_paths', ()),
+                   config.get('skip_hidden', False), config.get('max_depth', 0))
+
+    def descend(self, depth: int) -> bool:
+        """Обходить ли подкаталоги каталога на уровне depth (корень - уровень 1)"""
+        return not self.max_depth or depth < self.max_depth
+
+    def excluded(self, entry: os.DirEntry) -> bool:
+        """Пропустить ли файл или каталог целиком"""
+        if self.names is not None and self.names.matches(entry.name):
+            return True
+        if self.paths is not None and self.paths.matches(entry.path):
+            return True
+        if self.prefixes:
+            path = os.path.normcase(os.path.abspath(entry.path))
+            if path in self.prefixes or path.startswith(self._subpaths):
+                return True
+        return self.skip_hidden and _is_hidden(entry)
+
+
+def _is_hidden(entry: os.DirEntry) -> bool:
+    if entry.name.startswith('.'):
+        return True
+    if os.name != 'nt':
+        return False
+    # В Windows атрибуты приходят вместе с листингом каталога, отдельного запроса нет
+    try:
+        attributes = entry.stat(follow_symlinks=False).st_file_attributes
+    except OSError:
+        return False
+    return bool(attributes & (stat.FILE_ATTRIBUTE_HIDDEN | stat.FILE_ATTRIBUTE_SYSTEM))
+
+
+NO_RULES = WalkRules()
+
+
+class _PathEntry(NamedTuple):
+    """Путь в виде записи каталога - для проверки WalkRules без листинга родительского каталога"""
+    name: str
+    path: str
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        return os.stat(self.path, follow_symlinks=follow_symlinks)
+
+
+class FoundFile(NamedTuple):
+    """Файл, найденный при обходе каталогов, со сведениями из того же обхода.
+
+    key - (st_dev, st_ino) файла, если у него могут быть другие пути: жёсткие
+    ссылки или символьная ссылка (link). Для обычных файлов key не
+    заполняется, чтобы не хранить по записи на каждый файл дерева.
+    """
+    path: str
+    size: int
+    mtime: float
+    key: Optional[Tuple[int, int]] = None
+    link: bool = False
+
+
+def _canonical(path: str) -> str:
+    return os.path.normcase(os.path.realpath(path))
+
+
+def normalize_roots(roots: Iterable[str]) -> List[str]:
+    """Директории поиска без повторов и без вложенных в другие директории списка.
+
+    Повторы и вложенность определяются по реальным путям (без символьных
+    ссылок), но директории остаются записанными так, как их задал
+    пользователь: по этому написанию проверяются exclude_paths и строятся
+    пути в отчёте. Порядок сохраняется.
+    """
+    canonical = {}
+    for root in roots:
+        canonical.setdefault(_canonical(root), root)
+    kept = []
+    for path, root in canonical.items():
+        outer = next((other for other in canonical if other != path and
+                      path.startswith(other.rstrip(os.sep) + os.sep)), None)
+        if outer is not None:
+            logging.info(f"Директория {root} входит в {canonical[outer]} и отдельно не обходится")
+        else:
+            kept.append(root)
+    return kept
+
+
+class SeenFiles:
+    """Файлы и каталоги, уже встреченные за один поиск по нескольким директориям.
+
+    Каталог, уже обойденный под другим путём (подключение того же каталога
+    в другое место, петля из точек соединения), повторно не обходится.
+    Файл с несколькими путями обрабатывается один раз: для жёстких и
+    символьных ссылок запоминается (st_dev, st_ino), и обрабатывается первый
+    встреченный путь. Символьная ссылка на файл, который обход выдаст под
+    его настоящим путём (covered, см. Discovery), пропускается сразу.
+    Пропущенные пути запоминаются как другие пути (aliases) обработанного
+    файла.
+
+    В Windows номер файла не приходит вместе с листингом каталога, поэтому
+    там жёсткие ссылки не распознаются, а точки соединения не обходятся.
+    """
+
+    def __init__(self, roots: Iterable[str] = ()):
+        # (реальный путь директории с разделителем на конце, директория как она задана)
+        self.roots: Tuple[Tuple[str, str], ...] = tuple((_canonical(root).rstrip(os.sep) + os.sep, root)
+                                                        for root in roots)
+        self._files: Dict[Tuple[int, int], str] = {}
+        self._directories: Set[Tuple[int, int]] = set()
+        self._aliases: Dict[Tuple[int, int], List[str]] = {}
+        self._lock = threading.Lock()
+
+    def enter_directory(self, key: Tuple[int, int]) -> bool:
+        """True, если каталог встретился впервые"""
+        with self._lock:
+            if key in self._directories:
+                return False
+            self._directories.add(key)
+            return True
+
+    def root_of(self, path: str) -> Optional[Tuple[str, str]]:
+        """Директория поиска, в которой лежит файл по реальному пути: (как задана, реальный путь)"""
+        canonical = _canonical(path)
+        for prefix, root in self.roots:
+            if canonical.startswith(prefix):
+                return root, prefix
+        return None
+
+    def first(self, found: FoundFile, covered: bool = False) -> bool:
+        """True, если файл нужно обработать; иначе путь запоминается как другой путь уже найденного файла.
+
+        covered - символьная ссылка на файл, который обход найдёт и под настоящим путём.
+        """
+        if found.key is None:
+            return True
+        with self._lock:
+            first = None if covered else self._files.setdefault(found.key, found.path)
+            if first == found.path:
+                return True
+            self._aliases.setdefault(found.key, []).append(found.path)
+            return False
+
+    def aliases(self, path: str) -> List[str]:
+        """Другие пути файла, пропущенные как повторы"""
+        if not self._aliases:
+            return []
+        try:
+            info = os.stat(path)
+        except OSError:
+            return []
+        with self._lock:
+            return list(self._aliases.get((info.st_dev, info.st_ino), ()))
+
+
+def _directory_key(entry: os.DirEntry) -> Optional[Tuple[int, int]]:
+    """(st_dev, st_ino) каталога или None, если его не нужно обходить (точка соединения Windows)"""
+    info = entry.stat(follow_symlinks=False)
+    if getattr(info, 'st_file_attributes', 0) & stat.FILE_ATTRIBUTE_REPARSE_POINT:
+        return None
+    return info.st_dev, info.st_ino
+
+
+def _list_directory(directory: str, depth: int, extensions: ExtensionMatcher, rules: WalkRules,
+                    seen: SeenFiles, ordered: bool) -> Tuple[List[FoundFile], List[str]]:
+    """Подходящие файлы и подкаталоги одного каталога (depth - его уровень, корень - 1).
+
+    Имя файла проверяется по маскам до запроса сведений о файле, а размер и
+    время изменения берутся из DirEntry. Каналы, устройства и сокеты
+    пропускаются: чтение из них может зависнуть навсегда. Подкаталоги,
+    исключённые правилами, глубже max_depth или уже обойденные (см.
+    SeenFiles), не возвращаются.
+    """
+    files, subdirs = [], []
+    descend = rules.descend(depth)
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if descend and not rules.excluded(entry):
+                            key = _directory_key(entry)
+                            if key is not None and (not key[1] or seen.enter_directory(key)):
+                                subdirs.append(entry.path)
+                            elif key is not None:
+                                logging.info(f"Каталог {entry.path} уже обойден под другим путём")
+                        continue
+                    if not extensions.matches(entry.name) or rules.excluded(entry):
+                        continue
+                    info = entry.stat()
+                    link = entry.is_symlink()
+                except OSError:
+                    continue
+                if stat.S_ISREG(info.st_mode):
+                    key = (info.st_dev, info.st_ino) if info.st_ino and (link or info.st_nlink > 1) else None
+                    files.append(FoundFile(entry.path, info.st_size, info.st_mtime, key, link))
+    except OSError as e:
+        logging.warning(f"Нет доступа к каталогу {directory}: {e}")
+    if ordered:
+        files.sort()
+        subdirs.sort()
+    return files, subdirs
+
+
+def walk_files(root: str, extensions: Iterable[str], workers: int = 1, ordered: bool = False,
+               rules: WalkRules = NO_RULES, seen: SeenFiles = None) -> Iterator[FoundFile]:
+    """Обход дерева каталогов через os.scandir.
+
+    Размер и время изменения файла передаются дальше - обработчику не нужно
+    запрашивать их повторно. Символьные ссылки на каталоги не раскрываются,
+    как и в os.walk.
+
+    workers > 1 - каталоги читаются параллельно несколькими потоками: на
+    сетевых дисках листинг каталога ждёт сети, и один поток простаивает
+    большую часть времени. ordered - файлы выдаются в одном и том же порядке
+    (по именам, каталог перед своими подкаталогами) при любом числе потоков.
+    rules - что пропускать при обходе (см. WalkRules). seen - общий для
+    нескольких директорий учёт уже обойденных каталогов (см. SeenFiles);
+    каждый каталог обходится не больше одного раза и без него.
+    """
+    extensions = compile_extensions(extensions)
+    seen = seen if seen is not None else SeenFiles([root])
+    try:
+        info = os.stat(root)
+        if info.st_ino and not seen.enter_directory((info.st_dev, info.st_ino)):
+            logging.info(f"Каталог {root} уже обойден под другим путём")
+            return
+    except OSError:
+        pass
+    if workers <= 1:
+        stack = [(root, 1)]
+        while stack:
+            directory, depth = stack.pop()
+            files, subdirs = _list_directory(directory, depth, extensions, rules, seen, ordered)
+            yield from files
+            stack.extend((subdir, depth + 1) for subdir in reversed(subdirs))
+    elif ordered:
+        yield from _walk_ordered(root, extensions, rules, seen, workers)
+    else:
+        yield from _walk_parallel(root, extensions, rules, seen, workers)
+
+
+def _walk_ordered(root: str, extensions: ExtensionMatcher, rules: WalkRules, seen: SeenFiles,
+                  workers: int) -> Iterator[FoundFile]:
+    """Обход в глубину, при котором подкаталоги читаются заранее в пуле потоков"""
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='walk')
+    try:
+        stack = [(pool.submit(_list_directory, root, 1, extensions, rules, seen, True), 1)]
+        while stack:
+            listing, depth = stack.pop()
+            files, subdirs = listing.result()
+            # Листинги подкаталогов запрашиваются сразу, а выдаются в порядке обхода
+            stack.extend(reversed([(pool.submit(_list_directory, subdir, depth + 1, extensions, rules, seen, True),
+                                    depth + 1) for subdir in subdirs]))
+            yield from files
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Форматы дат в modified_after и modified_before
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+
+
+def parse_date(value: str) -> Optional[float]:
+    """Начало дня из строки даты как время в секундах или None для пустой строки"""
+    value = value.strip()
+    if not value:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"Неверная дата '{value}', ожидается ГГГГ-ММ-ДД или ДД.ММ.ГГГГ")
+
+
+class FileFilter:
+    """Отбор найденных файлов по размеру и времени изменения.
+
+    Проверяется только то, что уже известно из обхода каталогов (FoundFile),
+    поэтому отсеянный файл не стоит ни одного обращения к диску и не попадает
+    в очередь обработки. size_limits - лимиты в МБ для отдельных расширений
+    ({'.txt': 500}); они действуют и на текстовые файлы, а остальные форматы
+    из WHOLE_FILE_EXTENSIONS ограничены max_file_size. modified_after и
+    modified_before - границы времени изменения (включая и не включая).
+    """
+
+    __slots__ = ('max_file_size', 'min_size', 'size_limits', 'modified_after', 'modified_before')
+
+    def __init__(self, max_file_size: int, min_size_kb: int = 0, size_limits: Dict[str, int] = None,
+                 modified_after: float = None, modified_before: float = None):
+        self.max_file_size = max_file_size * 1024 * 1024
+        self.min_size = min_size_kb * 1024
+        self.size_limits = {ext.lower(): limit * 1024 * 1024 for ext, limit in (size_limits or {}).items()}
+        self.modified_after = modified_after
+        self.modified_before = modified_before
+
+    @classmethod
+    def from_config(cls, config: dict, max_file_size: int) -> 'FileFilter':
+        modified_after = parse_date(config.get('modified_after', ''))
+        max_age_days = config.get('max_age_days', 0)
+        if max_age_days > 0:
+            oldest = time.time() - max_age_days * 86400
+            modified_after = oldest if modified_after is None else max(modified_after, oldest)
+        return cls(max_file_size, config.get('min_file_size_kb', 0), config.get('size_limits'),
+                   modified_after, parse_date(config.get('modified_before', '')))
+
+    def reason(self, found: FoundFile) -> Optional[str]:
+        """Почему файл пропускается, или None, если его нужно обработать"""
+        if found.size < self.min_size:
+            return 'меньше минимального размера'
+        ext = os.path.splitext(found.path)[1].lower()
+        limit = self.size_limits.get(ext)
+        if limit is None and ext in WHOLE_FILE_EXTENSIONS:
+            limit = self.max_file_size
+        if limit is not None and found.size > limit:
+            return 'больше лимита размера'
+        if self.modified_after is not None and found.mtime < self.modified_after:
+            return 'изменены раньше заданной даты'
+        if self.modified_before is not None and found.mtime >= self.modified_before:
+            return 'изменены позже заданной даты'
+        return None
+
+
+class Discovery:
+    """Файлы одного дерева каталогов для обработки - один обход на весь поиск.
+
+    Итерация выдаёт файлы по мере обхода; файлы, не прошедшие FileFilter
+    (размер, лимиты расширений, время изменения), отсеиваются сразу по данным
+    обхода и считаются в skipped по причинам - в лог попадает одна итоговая
+    строка, а не строка на файл. total - сколько файлов выдано до сих пор,
+    finished - обход закончен и total окончательный. Один и тот же объект
+    служит и источником файлов для обработки, и счётчиком для индикатора
+    прогресса. seen - учёт уже встреченных файлов и каталогов, общий для всех
+    директорий одного поиска (см. SeenFiles).
+    """
+
+    def __init__(self, root: str, extensions: Iterable[str], max_file_size: int, config: dict = None,
+                 seen: SeenFiles = None):
+        self.root = root
+        self.extensions = compile_extensions(extensions)
+        self.max_file_size = max_file_size
+        self.config = config or {}
+        self.filter = FileFilter.from_config(self.config, max_file_size)
+        self.rules = WalkRules.from_config(self.config)
+        self.seen = seen if seen is not None else SeenFiles([root])
+        self.total = 0
+        self.skipped: Counter = Counter()
+        self.finished = False
+        self._started = False
+
+    def __iter__(self) -> Iterator[FoundFile]:
+        if self._started:
+            raise RuntimeError(f"Обход {self.root} уже выполнен")
+        self._started = True
+        for found in walk_files(self.root, self.extensions, self.config.get('walk_threads', 1),
+                                self.config.get('ordered_discovery', False), self.rules, self.seen):
+            reason = self.filter.reason(found)
+            if reason is None and not self.seen.first(found, found.link and self._covered(found)):
+                reason = 'другие пути уже найденных файлов'
+            if reason is not None:
+                self.skipped[reason] += 1
+                continue
+            self.total += 1
+            yield found
+        self.finished = True
+        logging.info(f"Найдено файлов для обработки в {self.root}: {self.total}")
+        if self.skipped:
+            summary = ', '.join(f"{reason}: {count}" for reason, count in self.skipped.most_common())
+            logging.info(f"Пропущено файлов в {self.root}: {sum(self.skipped.values())} ({summary})")
+
+    def _covered(self, link: FoundFile) -> bool:
+        """Выдаст ли обход файл символьной ссылки под его настоящим путём.
+
+        Настоящий путь проверяется теми же правилами, что и при обходе: он
+        должен лежать в одной из директорий поиска, не быть исключённым или
+        скрытым ни сам, ни в одном из каталогов на пути к нему, не быть
+        глубже max_depth, подходить под маски и пройти FileFilter. Иначе
+        ссылка обрабатывается под своим путём - сам файл обход не найдёт.
+        """
+        target = os.path.realpath(link.path)
+        found = self.seen.root_of(target)
+        if found is None:
+            return False
+        root, prefix = found
+        # normcase не меняет длину пути, поэтому префикс отрезается и от исходного написания
+        parts = target[len(prefix):].split(os.sep)
+        if self.rules.max_depth and len(parts) > self.rules.max_depth:
+            return False
+        if not self.extensions.matches(parts[-1]):
+            return False
+        path = root
+        for part in parts:
+            path = os.path.join(path, part)
+            if self.rules.excluded(_PathEntry(part, path)):
+                return False
+        return self.filter.reason(link._replace(path=path)) is None
+
+
+_DONE = object()
+
+
+def _walk_parallel(root: str, extensions: ExtensionMatcher, rules: WalkRules, seen: SeenFiles,
+                   workers: int) -> Iterator[FoundFile]:
+    """Обход очередью каталогов: потоки берут каталог, отдают его файлы и кладут в очередь подкаталоги"""
+    directories: queue.Queue = queue.Queue()
+    listings: queue.Queue = queue.Queue(maxsize=WALK_QUEUE_SIZE)
+    stop = threading.Event()
+    lock = threading.Lock()
+    # Каталоги, которые уже в очереди или читаются; когда их не остаётся, обход закончен
+    pending = [1]
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                listings.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker() -> None:
+        while not stop.is_set():
+            try:
+                directory, depth = directories.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                files, subdirs = _list_directory(directory, depth, extensions, rules, seen, False)
+            except Exception as e:
+                # Каталог всё равно должен считаться прочитанным, иначе обход не закончится
+                logging.error(f"Ошибка обхода каталога {directory}: {e}")
+                files, subdirs = [], []
+            with lock:
+                pending[0] += len(subdirs)
+            for subdir in subdirs:
+                directories.put((subdir, depth + 1))
+            if files and not put(files):
+                return
+            with lock:
+                pending[0] -= 1
+                finished = pending[0] == 0
+            if finished:
+                put(_DONE)
+                return
+
+    directories.put((root, 1))
+    threads = [threading.Thread(target=worker, name=f'walk-{i}', daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            files = listings.get()
+            if files is _DONE:
+                return
+            yield from files
+    finally:
+        stop.set()
@@ -1,52 +1,76 @@
 import os
-import fnmatch
 import zipfile
 import tempfile
 from io import BytesIO
-from typing import Set, Dict, List
+from typing import Set, Dict, Iterable, Iterator, List, Tuple
 import logging
 
-# Глобальная переменная для хранения ключевых слов в нижнем регистре
-KEYWORDS_LOWER = set()
+from content_sniffing import EXTENSION_KINDS, sniff_file
+from file_discovery import compile_extensions
+from keyword_matcher import FileHits, KeywordMatcher, STREAM_CHUNK_SIZE
+
+# Сколько текста ячеек Excel проверяется за один вызов поиска
+EXCEL_BLOCK_CHARS = 256 * 1024
 
 
 def load_keywords(keywords_file: str) -> List[str]:
     """Загрузка ключевых слов из файла с проверкой кодировки"""
-    global KEYWORDS_LOWER
     encodings = ['utf-8', 'cp1251', 'iso-8859-1', 'utf-8-sig']
     for encoding in encodings:
         try:
             with open(keywords_file, 'r', encoding=encoding) as f:
                 keywords = [line.strip() for line in f if line.strip()]
                 if keywords:
-                    # Сохраняем ключевые слова в нижнем регистре для быстрого поиска
-                    KEYWORDS_LOWER = {kw.lower() for kw in keywords}
                     return keywords
         except UnicodeDecodeError:
             continue
     raise ValueError(f"Не удалось декодировать файл {keywords_file} с поддержанными кодировками: {encodings}")
 
 
-def search_in_text(text: str) -> Set[str]:
-    """Поиск ключевых слов в тексте с использованием множеств для скорости"""
-    if not text:
-        return set()
-
-    text_lower = text.lower()
-    return {kw for kw in KEYWORDS_LOWER if kw in text_lower}
-
-
-def search_in_image(image_data: BytesIO or str, config: dict) -> Set[str]:
+def load_matcher(keywords_file: str, config: dict = None) -> KeywordMatcher:
+    """Загрузка ключевых слов и сборка скомпилированного поиска по ним.
+
+    С matcher_cache_dir собранный набор сохраняется на диск и при следующем
+    запуске с теми же словами и параметрами загружается оттуда.
+    """
+    config = config or {}
+    keywords = load_keywords(keywords_file)
+    options = {
+        'backend': config.get('matcher_backend', 'auto'),
+        'scan_mode': config.get('scan_mode', 'full'),
+        'collect_locations': config.get('collect_locations', False),
+        'match_mode': config.get('match_mode', 'substring'),
+        'fuzzy_distance': config.get('fuzzy_distance', 0),
+        'fuzzy_sources': tuple(config.get('fuzzy_sources', ('ocr',))),
+        'text_folding': config.get('text_folding', False),
+    }
+    cache_dir = config.get('matcher_cache_dir')
+    if cache_dir:
+        from matcher_cache import load_cached_matcher
+        return load_cached_matcher(keywords, options, cache_dir)
+    return KeywordMatcher(keywords, **options)
+
+
+def stream_chunk_size(config: dict) -> int:
+    """Размер блока потокового чтения в байтах (в конфиге - в МБ)"""
+    size_mb = config.get('stream_chunk_size', 0)
+    return size_mb * 1024 * 1024 if size_mb > 0 else STREAM_CHUNK_SIZE
+
+
+def search_in_image(image_data: BytesIO or str, config: dict, matcher: KeywordMatcher,
+                    hits: FileHits = None, location: str = 'изображение (OCR)') -> Set[str]:
     """Распознавание текста с изображения"""
+    hits = hits if hits is not None else FileHits(matcher)
+
     # Проверяем доступность OCR через конфиг
-    if not config.get('has_ocr', False):
-        return set()
+    if not config.get('has_ocr', False) or hits.done:
+        return hits.found
 
     try:
         from PIL import Image
         import pytesseract
     except ImportError:
-        return set()
+        return hits.found
 
     try:
         img = Image.open(image_data) if isinstance(image_data, BytesIO) else Image.open(image_data)
@@ -59,136 +83,226 @@ def search_in_image(image_data: BytesIO or str, config: dict) -> Set[str]:
         config_param = config.get('tesseract_config', '--oem 3 --psm 6')
 
         text = pytesseract.image_to_string(img, lang=languages, config=config_param)
-        return search_in_text(text)
+        hits.scan(text, location, 'ocr')
     except Exception as e:
         logging.error(f"Ошибка обработки изображения: {e}")
-        return set()
+    return hits.found
 
 
-def search_in_pdf(pdf_path: str, config: dict) -> Set[str]:
+def search_in_pdf(pdf_path: str, config: dict, matcher: KeywordMatcher, hits: FileHits = None) -> Set[str]:
     """Обработка PDF файлов"""
+    hits = hits if hits is not None else FileHits(matcher)
     try:
         import fitz  # PyMuPDF
     except ImportError:
-        return set()
+        return hits.found
 
-    found = set()
     try:
-        with fitz.open(pdf_path) as doc:
+        with fitz.open(pdf_path, filetype='pdf') as doc:
             for page in doc:
                 # Текст со страницы
-                text = page.get_text()
-                found.update(search_in_text(text))
+                page_location = f"стр. {page.number + 1}"
+                hits.scan(page.get_text(), page_location, 'pdf')
 
                 # Обработка изображений (только если есть OCR)
                 for img in page.get_images(full=True):
+                    if hits.done:
+                        break
                     xref = img[0]
                     base_image = doc.extract_image(xref)
                     if base_image and "image" in base_image:
                         image_data = BytesIO(base_image["image"])
-                        found.update(search_in_image(image_data, config))
+                        search_in_image(image_data, config, matcher, hits, f"{page_location}, изображение (OCR)")
+
+                if hits.done:
+                    break
     except Exception as e:
         logging.error(f"Ошибка обработки PDF {pdf_path}: {e}")
-    return found
+    return hits.found
 
 
-def search_in_docx(docx_path: str, config: dict) -> Set[str]:
+def search_in_docx(docx_path: str, config: dict, matcher: KeywordMatcher, hits: FileHits = None) -> Set[str]:
     """Обработка DOCX файлов"""
+    hits = hits if hits is not None else FileHits(matcher)
     try:
         import docx2txt
     except ImportError:
-        return set()
+        return hits.found
 
-    found = set()
     try:
         # Текст из документа
-        text = docx2txt.process(docx_path)
-        found.update(search_in_text(text))
+        hits.scan(docx2txt.process(docx_path), 'текст документа', 'docx')
+        if hits.done:
+            return hits.found
 
         # Изображения из документа (только если есть OCR)
         with tempfile.TemporaryDirectory() as temp_dir:
             docx2txt.process(docx_path, temp_dir)
             for img_file in os.listdir(temp_dir):
+                if hits.done:
+                    break
                 if img_file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff')):
                     img_path = os.path.join(temp_dir, img_file)
-                    found.update(search_in_image(img_path, config))
+                    search_in_image(img_path, config, matcher, hits, f"{img_file} (OCR)")
     except Exception as e:
         logging.error(f"Ошибка обработки DOCX {docx_path}: {e}")
-    return found
-
-
-def search_in_excel(excel_path: str) -> Set[str]:
-    """Обработка Excel файлов"""
+    return hits.found
+
+
+def _cell_ref(hits: FileHits, sheet: str, row: int, col: int) -> str:
+    """Адрес ячейки вида Лист1!B5; строится, только если собираются места совпадений"""
+    if not hits.matcher.collect_locations:
+        return None
+    from openpyxl.utils import get_column_letter
+    return f"{sheet}!{get_column_letter(col)}{row}"
+
+
+def _scan_cells(hits: FileHits, cells: Iterable[Tuple[str, int, int, str]]) -> None:
+    """Поиск по ячейкам (лист, строка, столбец, текст) блоками по EXCEL_BLOCK_CHARS символов.
+
+    Каждая ячейка отдельно - это вызов поиска на ячейку; блок из тысяч
+    ячеек проверяется одним вызовом, а совпадения относятся к своим ячейкам
+    по смещениям внутри блока.
+    """
+    block, refs, size = [], [], 0
+    for sheet, row, col, text in cells:
+        block.append(text)
+        refs.append((sheet, row, col))
+        size += len(text)
+        if size >= EXCEL_BLOCK_CHARS:
+            _scan_block(hits, block, refs)
+            if hits.done:
+                return
+            block, refs, size = [], [], 0
+    _scan_block(hits, block, refs)
+
+
+def _scan_block(hits: FileHits, block: List[str], refs: List[Tuple[str, int, int]]) -> None:
+    locations = [_cell_ref(hits, *ref) for ref in refs] if hits.matcher.collect_locations else None
+    hits.scan_cells(block, locations, 'excel')
+
+
+def _xlsx_cells(wb) -> Iterator[Tuple[str, int, int, str]]:
+    """Текстовые ячейки книги .xlsx по строкам"""
+    for sheet in wb.sheetnames:
+        ws = wb[sheet]
+        for row_idx, row in enumerate(ws.iter_rows(min_row=1, min_col=1, values_only=True), 1):
+            for col_idx, cell in enumerate(row, 1):
+                if cell and isinstance(cell, str):
+                    yield sheet, row_idx, col_idx, cell
+
+
+def _xls_cells(sheets: dict) -> Iterator[Tuple[str, int, int, str]]:
+    """Текстовые ячейки книги .xls по столбцам.
+
+    Числовые столбцы пропускаются целиком по типу данных, а строки в
+    остальных отбираются операциями над столбцом, без обхода строк таблицы.
+    """
+    for sheet_name, sheet_data in sheets.items():
+        for col_idx in range(sheet_data.shape[1]):
+            column = sheet_data.iloc[:, col_idx]
+            if column.dtype != object:
+                continue
+            try:
+                # У нестроковых значений длина NaN - они отбрасываются вместе с пустыми строками
+                strings = column[column.str.len() > 0]
+            except AttributeError:
+                # В столбце нет ни одной строки
+                continue
+            # Первая строка листа ушла в заголовки, данные начинаются со второй
+            for row_idx, value in zip(strings.index + 2, strings.tolist()):
+                yield sheet_name, int(row_idx), col_idx + 1, value
+
+
+def search_in_excel(excel_path: str, matcher: KeywordMatcher, hits: FileHits = None, xlsx: bool = None) -> Set[str]:
+    """Обработка Excel файлов; xlsx - формат книги, если он известен не по расширению"""
+    hits = hits if hits is not None else FileHits(matcher)
     try:
         import pandas as pd
         import openpyxl
     except ImportError:
-        return set()
+        return hits.found
 
-    found = set()
     try:
         # Пропускаем временные файлы Excel
         if os.path.basename(excel_path).startswith('~$'):
-            return set()
-
-        if excel_path.endswith('.xlsx'):
-            wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
-            for sheet in wb.sheetnames:
-                ws = wb[sheet]
-                for row in ws.iter_rows(values_only=True):
-                    for cell in row:
-                        if cell and isinstance(cell, str):
-                            found.update(search_in_text(cell))
+            return hits.found
+
+        if xlsx is None:
+            xlsx = excel_path.lower().endswith('.xlsx')
+        if xlsx:
+            # Файл передаётся открытым: по имени openpyxl не откроет книгу с другим расширением
+            with open(excel_path, 'rb') as f:
+                wb = openpyxl.load_workbook(f, read_only=True, data_only=True)
+                try:
+                    _scan_cells(hits, _xlsx_cells(wb))
+                finally:
+                    wb.close()
         else:  # .xls
-            df = pd.read_excel(excel_path, sheet_name=None)
-            for sheet_name, sheet_data in df.items():
-                for _, row in sheet_data.iterrows():
-                    for value in row:
-                        if isinstance(value, str):
-                            found.update(search_in_text(str(value)))
+            _scan_cells(hits, _xls_cells(pd.read_excel(excel_path, sheet_name=None)))
     except Exception as e:
         logging.error(f"Ошибка обработки Excel {excel_path}: {e}")
-    return found
-
-
-def search_in_archive(archive_path: str, extensions: List[str], config: dict) -> Set[str]:
-    """Обработка архивов с поддержкой изображений"""
-    found = set()
+    return hits.found
+
+
+def _search_in_extracted(file: str, extracted_file: str, config: dict, matcher: KeywordMatcher,
+                         hits: FileHits) -> None:
+    """Обработка извлеченного из архива файла в зависимости от типа"""
+    # Обрабатываем изображения
+    if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff')):
+        search_in_image(extracted_file, config, matcher, hits)
+    # Обрабатываем PDF
+    elif file.lower().endswith('.pdf') and config.get('has_pdf', False):
+        search_in_pdf(extracted_file, config, matcher, hits)
+    # Обрабатываем DOCX
+    elif file.lower().endswith('.docx') and config.get('has_docx', False):
+        search_in_docx(extracted_file, config, matcher, hits)
+    # Обрабатываем Excel
+    elif file.lower().endswith(('.xls', '.xlsx')) and config.get('has_excel', False):
+        search_in_excel(extracted_file, matcher, hits)
+
+
+def search_in_archive(archive_path: str, extensions: List[str], config: dict,
+                      matcher: KeywordMatcher, hits: FileHits = None, kind: str = None) -> Set[str]:
+    """Обработка архивов с поддержкой изображений; kind - zip, rar или 7z, если формат известен не по расширению"""
+    hits = hits if hits is not None else FileHits(matcher)
+    extensions = compile_extensions(extensions)
+    kind = kind or os.path.splitext(archive_path)[1].lower().lstrip('.')
     try:
-        if archive_path.endswith('.zip'):
-            with zipfile.ZipFile(archive_path, 'r') as z:
+        if kind in ('zip', 'rar'):
+            if kind == 'zip':
+                archive = zipfile.ZipFile(archive_path, 'r')
+            else:
+                try:
+                    import rarfile
+                except ImportError:
+                    return hits.found
+                archive = rarfile.RarFile(archive_path, 'r')
+
+            with archive as z:
                 for file in z.namelist():
-                    if any(fnmatch.fnmatch(file, ext) for ext in extensions):
+                    if hits.done:
+                        break
+                    if not extensions.matches(file):
+                        continue
+                    with hits.within(file):
                         # Для текстовых файлов читаем напрямую
                         if file.lower().endswith(('.txt', '.csv', '.log', '.xml', '.html', '.htm')):
                             with z.open(file) as f:
-                                content = f.read().decode('utf-8', errors='ignore')
-                                found.update(search_in_text(content))
+                                hits.scan_stream(f, stream_chunk_size(config))
                         # Для изображений и других бинарных файлов извлекаем во временную директорию
                         else:
                             with tempfile.TemporaryDirectory() as temp_dir:
                                 z.extract(file, temp_dir)
                                 extracted_file = os.path.join(temp_dir, file)
                                 if os.path.isfile(extracted_file):
-                                    # Обрабатываем изображения
-                                    if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff')):
-                                        found.update(search_in_image(extracted_file, config))
-                                    # Обрабатываем PDF
-                                    elif file.lower().endswith('.pdf') and config.get('has_pdf', False):
-                                        found.update(search_in_pdf(extracted_file, config))
-                                    # Обрабатываем DOCX
-                                    elif file.lower().endswith('.docx') and config.get('has_docx', False):
-                                        found.update(search_in_docx(extracted_file, config))
-                                    # Обрабатываем Excel
-                                    elif file.lower().endswith(('.xls', '.xlsx')) and config.get('has_excel', False):
-                                        found.update(search_in_excel(extracted_file))
-
-
-        elif archive_path.endswith('.7z'):
+                                    _search_in_extracted(file, extracted_file, config, matcher, hits)
+
+        elif kind == '7z':
             try:
                 import py7zr
             except ImportError:
-                return set()
+                return hits.found
             with tempfile.TemporaryDirectory() as temp_dir:
                 try:
                     with py7zr.SevenZipFile(archive_path, mode='r') as z:
@@ -197,140 +311,111 @@ def search_in_archive(archive_path: str, extensions: List[str], config: dict) ->
                     # Рекурсивно обходим извлеченные файлы
                     for root, dirs, files in os.walk(temp_dir):
                         for file in files:
+                            if hits.done:
+                                break
                             file_path = os.path.join(root, file)
                             relative_path = os.path.relpath(file_path, temp_dir)
-                            if any(fnmatch.fnmatch(relative_path, ext) for ext in extensions):
+                            if not extensions.matches(relative_path):
+                                continue
+                            with hits.within(relative_path):
                                 # Обрабатываем файлы в зависимости от типа
                                 if file.lower().endswith(('.txt', '.csv', '.log', '.xml', '.html', '.htm')):
                                     try:
-                                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                            content = f.read()
-                                            found.update(search_in_text(content))
-                                    except:
-                                        try:
-                                            with open(file_path, 'rb') as f:
-                                                content = f.read().decode('utf-8', errors='ignore')
-                                                found.update(search_in_text(content))
-                                        except:
-                                            pass
-                                elif file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff')):
-                                    found.update(search_in_image(file_path, config))
-                                elif file.lower().endswith('.pdf') and config.get('has_pdf', False):
-                                    found.update(search_in_pdf(file_path, config))
-                                elif file.lower().endswith('.docx') and config.get('has_docx', False):
-                                    found.update(search_in_docx(file_path, config))
-                                elif file.lower().endswith(('.xls', '.xlsx')) and config.get('has_excel', False):
-                                    found.update(search_in_excel(file_path))
+                                        with open(file_path, 'rb') as f:
+                                            hits.scan_stream(f, stream_chunk_size(config))
+                                    except OSError:
+                                        pass
+                                else:
+                                    _search_in_extracted(file, file_path, config, matcher, hits)
+                        if hits.done:
+                            break
                 except Exception as e:
                     logging.error(f"Ошибка обработки 7z архива {archive_path}: {e}")
 
-        elif archive_path.endswith('.rar'):
-            try:
-                import rarfile
-            except ImportError:
-                return set()
-
-            with rarfile.RarFile(archive_path, 'r') as z:
-                for file in z.namelist():
-                    if any(fnmatch.fnmatch(file, ext) for ext in extensions):
-                        # Для текстовых файлов читаем напрямую
-                        if file.lower().endswith(('.txt', '.csv', '.log', '.xml', '.html', '.htm')):
-                            with z.open(file) as f:
-                                content = f.read().decode('utf-8', errors='ignore')
-                                found.update(search_in_text(content))
-                        # Для изображений и других бинарных файлов извлекаем во временную директорию
-                        else:
-                            with tempfile.TemporaryDirectory() as temp_dir:
-                                z.extract(file, temp_dir)
-                                extracted_file = os.path.join(temp_dir, file)
-                                if os.path.isfile(extracted_file):
-                                    # Обрабатываем изображения
-                                    if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff')):
-                                        found.update(search_in_image(extracted_file, config))
-                                    # Обрабатываем PDF
-                                    elif file.lower().endswith('.pdf') and config.get('has_pdf', False):
-                                        found.update(search_in_pdf(extracted_file, config))
-                                    # Обрабатываем DOCX
-                                    elif file.lower().endswith('.docx') and config.get('has_docx', False):
-                                        found.update(search_in_docx(extracted_file, config))
-                                    # Обрабатываем Excel
-                                    elif file.lower().endswith(('.xls', '.xlsx')) and config.get('has_excel', False):
-                                        found.update(search_in_excel(extracted_file))
-
     except Exception as e:
         logging.error(f"Ошибка обработки архива {archive_path}: {e}")
-    return found
+    return hits.found
 
 
-def process_file(file_path: str, extensions: List[str], max_file_size: int, config: dict) -> Dict[str, Set[str]]:
-    """Обработка отдельного файла"""
-    found = set()
-    try:
-        # Проверяем размер файла
-        file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-        if file_size_mb > max_file_size:
-            logging.warning(
-                f"Пропуск файла {file_path} (размер {file_size_mb:.2f} МБ превышает лимит {max_file_size} МБ)")
-            return {}
+def process_file(file_path: str, extensions: List[str], max_file_size: int, config: dict,
+                 matcher: KeywordMatcher, text_cache=None, size: int = None) -> Dict[str, FileHits]:
+    """Обработка отдельного файла.
 
+    text_cache (ExtractedTextCache) - куда сохранить извлечённый текст для
+    повторной проверки на добавленные ключевые слова. size - размер файла,
+    если он уже известен из обхода каталогов.
+    """
+    hits = FileHits(matcher, record=text_cache is not None)
+    try:
         ext = os.path.splitext(file_path)[1].lower()
 
         # Проверяем, соответствует ли файл заданным расширениям
-        if not any(fnmatch.fnmatch(file_path, ext_pattern) for ext_pattern in extensions):
+        if not compile_extensions(extensions).matches(file_path):
             return {}
 
+        # Формат определяется по содержимому: переименованные PDF и DOCX обрабатываются
+        # как есть, а двоичные файлы без своего обработчика не читаются как текст
+        kind = EXTENSION_KINDS.get(ext)
+        if config.get('sniff_content', True):
+            sniffed = sniff_file(file_path)
+            if sniffed not in ('text', 'binary', 'ole'):
+                kind = sniffed
+            elif sniffed != 'text' and kind is None:
+                logging.info(f"Пропуск двоичного файла {file_path}")
+                return {}
+
+        # Проверяем размер файла (форматы, разбираемые целиком, и расширения со своим лимитом)
+        limit = config.get('size_limits', {}).get(ext, max_file_size if kind is not None else None)
+        if limit is not None:
+            file_size_mb = (size if size is not None else os.path.getsize(file_path)) / (1024 * 1024)
+            if file_size_mb > limit:
+                logging.warning(
+                    f"Пропуск файла {file_path} (размер {file_size_mb:.2f} МБ превышает лимит {limit} МБ)")
+                return {}
+
         # Обработка в зависимости от типа файла
-        if ext in ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff'):
+        if kind == 'image':
             # Проверяем доступность OCR через конфиг
             if config.get('has_ocr', False):
-                found = search_in_image(file_path, config)
+                search_in_image(file_path, config, matcher, hits)
             else:
                 logging.info(f"Пропуск изображения {file_path} (OCR недоступен)")
-        elif ext == '.pdf':
+        elif kind == 'pdf':
             # Проверяем доступность обработки PDF
             if config.get('has_pdf', False):
-                found = search_in_pdf(file_path, config)
+                search_in_pdf(file_path, config, matcher, hits)
             else:
                 logging.info(f"Пропуск PDF {file_path} (обработка PDF недоступна)")
-        elif ext == '.docx':
+        elif kind == 'docx':
             # Проверяем доступность обработки DOCX
             if config.get('has_docx', False):
-                found = search_in_docx(file_path, config)
+                search_in_docx(file_path, config, matcher, hits)
             else:
                 logging.info(f"Пропуск DOCX {file_path} (обработка DOCX недоступна)")
-        elif ext in ('.xls', '.xlsx'):
+        elif kind in ('xls', 'xlsx'):
             # Проверяем доступность обработки Excel
             if config.get('has_excel', False):
-                found = search_in_excel(file_path)
+                search_in_excel(file_path, matcher, hits, kind == 'xlsx')
             else:
                 logging.info(f"Пропуск Excel {file_path} (обработка Excel недоступна)")
-        elif ext in ('.zip', '.7z', '.rar'):
+        elif kind in ('zip', '7z', 'rar'):
             # Для архивов проверяем доступность соответствующих модулей
-            if ext == '.7z' and not config.get('has_7z', False):
+            if kind == '7z' and not config.get('has_7z', False):
                 logging.info(f"Пропуск 7Z {file_path} (обработка 7Z недоступна)")
-            elif ext == '.rar' and not config.get('has_rar', False):
+            elif kind == 'rar' and not config.get('has_rar', False):
                 logging.info(f"Пропуск RAR {file_path} (обработка RAR недоступна)")
             else:
-                found = search_in_archive(file_path, extensions, config)  # Передаем config
+                search_in_archive(file_path, extensions, config, matcher, hits, kind)
         else:
-            # Обработка текстовых файлов
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    found = search_in_text(content)
-            except UnicodeDecodeError:
-                # Если UTF-8 не работает, пробуем другие кодировки
-                encodings = ['cp1251', 'iso-8859-1', 'latin1']
-                for encoding in encodings:
-                    try:
-                        with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-                            content = f.read()
-                            found = search_in_text(content)
-                            break
-                    except UnicodeDecodeError:
-                        continue
-
-        return {file_path: found} if found else {}
+            # Текстовые файлы читаем потоково и ищем по сырым байтам без декодирования
+            with open(file_path, 'rb') as f:
+                hits.scan_stream(f, stream_chunk_size(config))
+
+        hits.finish()
+        # Текст, прочитанный не до конца (режимы any/all), для повторной проверки не годится
+        if text_cache is not None and hits.segments and not hits.done:
+            text_cache.put(file_path, hits.segments)
+        return {file_path: hits} if hits else {}
     except Exception as e:
         logging.error(f"Ошибка обработки файла {file_path}: {e}")
         return {}
@@ -0,0 +1,135 @@
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Источники текста, для которых включается нечёткий поиск
+FUZZY_SOURCES = ('ocr', 'pdf', 'docx', 'excel')
+
+# Слова короче не ищутся нечётко: у "акт" с одной ошибкой слишком много ложных совпадений
+FUZZY_MIN_LENGTH = 5
+# На сколько символов слова допускается одна ошибка
+CHARS_PER_ERROR = 4
+
+# Типичные замены Tesseract, которые не считаются ошибкой
+OCR_CONFUSIONS = {'о': '0', 'з': '3', 'б': '6', 'ч': '4', 'л': 'п', 'п': 'л', 'ш': 'щ', 'щ': 'ш'}
+
+
+def allowed_distance(keyword: str, max_distance: int) -> int:
+    """Допустимое число ошибок для слова: не больше max_distance и одной на CHARS_PER_ERROR символов"""
+    if len(keyword) < FUZZY_MIN_LENGTH:
+        return 0
+    return min(max_distance, len(keyword) // CHARS_PER_ERROR)
+
+
+def _combine_bits(bits: List[int], size: int) -> int:
+    """Целое с выставленными битами из списка; собирается за один проход, без промежуточных больших чисел"""
+    buffer = bytearray(size // 8 + 1)
+    for bit in bits:
+        buffer[bit >> 3] |= 1 << (bit & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class FuzzyMatcher:
+    """Приблизительный поиск слов с ошибками распознавания (алгоритм Ву-Манбера).
+
+    Все слова упаковываются в одно большое целое: каждому слову отведена
+    полоса битов по его длине, бит j полосы означает "первые j+1 букв слова
+    совпали с ошибками не больше d". На каждый символ текста выполняется
+    несколько побитовых операций над всем числом сразу - по одной на
+    допустимое число ошибок, а не на каждое слово, так что время почти
+    линейно по длине текста. Биты, перетекающие при сдвиге из конца одной
+    полосы в начало следующей, безвредны: начальный бит каждой полосы всё
+    равно выставляется на каждом шаге.
+    """
+    name = 'fuzzy'
+
+    def __init__(self, keywords: Iterable[str], max_distance: int):
+        self.max_distance = 0
+        self.max_length = 0
+        self._labels: List[Tuple[int, str, int]] = []  # (бит конца полосы, слово, допустимые ошибки)
+        # Номера битов собираются списками и объединяются в числа один раз в конце:
+        # побитовое ИЛИ с растущим большим числом на каждом символе квадратично по числу слов
+        mask_bits: Dict[str, List[int]] = {}
+        start_bits: List[int] = []
+        end_bits: Dict[int, List[int]] = {}
+        bit = 0
+        for keyword in sorted(set(keywords)):
+            distance = allowed_distance(keyword, max_distance)
+            if not distance:
+                continue
+            for j, ch in enumerate(keyword):
+                for variant in {ch, OCR_CONFUSIONS.get(ch, ch)}:
+                    mask_bits.setdefault(variant, []).append(bit + j)
+            start_bits.append(bit)
+            end = bit + len(keyword) - 1
+            end_bits.setdefault(distance, []).append(end)
+            self._labels.append((end, keyword, distance))
+            self.max_distance = max(self.max_distance, distance)
+            self.max_length = max(self.max_length, len(keyword))
+            bit += len(keyword)
+        self._masks: Dict[str, int] = {ch: _combine_bits(bits, bit) for ch, bits in mask_bits.items()}
+        self._starts = _combine_bits(start_bits, bit)
+        # Маски концов полос по допустимому числу ошибок
+        self._ends: Dict[int, int] = {distance: _combine_bits(bits, bit) for distance, bits in end_bits.items()}
+        self._by_end = {end: (keyword, distance) for end, keyword, distance in self._labels}
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def _iter_ends(self, text: str) -> Iterator[Tuple[int, str, int]]:
+        """Тройки (позиция последнего символа, слово, допустимые ошибки) для каждого окончания совпадения"""
+        k = self.max_distance
+        masks, starts, ends = self._masks, self._starts, self._ends
+        any_end = 0
+        for mask in ends.values():
+            any_end |= mask
+        # states[d] - состояние с не более чем d ошибками; префикс длины d совпадает удалением букв
+        states = [0] * (k + 1)
+        for d in range(1, k + 1):
+            states[d] = (states[d - 1] << 1) | starts
+        for i, ch in enumerate(text):
+            mask = masks.get(ch, 0)
+            previous = states[0]
+            current = ((previous << 1) | starts) & mask
+            states[0] = current
+            for d in range(1, k + 1):
+                old = states[d]
+                # Совпадение | вставка в тексте | замена и пропуск буквы слова
+                new = (((old << 1) | starts) & mask) | previous | ((previous | current) << 1) | starts
+                previous, current = old, new
+                states[d] = new
+            if states[k] & any_end:
+                for d, end_mask in ends.items():
+                    hit = states[d] & end_mask
+                    while hit:
+                        low = hit & -hit
+                        keyword, distance = self._by_end[low.bit_length() - 1]
+                        yield i, keyword, distance
+                        hit ^= low
+
+    def iter_spans(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Тройки (примерное начало, конец, слово); соседние окончания одного вхождения склеиваются"""
+        last_end: Dict[str, int] = {}
+        for i, keyword, distance in self._iter_ends(text):
+            previous = last_end.get(keyword)
+            last_end[keyword] = i
+            if previous is not None and i - previous <= 2 * distance:
+                continue
+            yield max(0, i - len(keyword) + 1), i + 1, keyword
+
+    def ends_at_end(self, text: str, keyword: str) -> bool:
+        """Есть ли совпадение слова, которое заканчивается последним символом текста"""
+        last = len(text) - 1
+        return any(i == last and found == keyword for i, found, _ in self._iter_ends(text))
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        for start, _, keyword in self.iter_spans(text):
+            yield start, keyword
+
+    def search(self, text: str) -> Set[str]:
+        return {keyword for _, keyword, _ in self._iter_ends(text)}
+
+    def first(self, text: str) -> Optional[str]:
+        return next((keyword for _, keyword, _ in self._iter_ends(text)), None)
+
+    def count(self, text: str) -> Counter:
+        return Counter(keyword for _, _, keyword in self.iter_spans(text))
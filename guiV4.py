@@ -4,13 +4,13 @@ import threading
 import os
 import logging
 from config_loader import load_config, create_default_config
+from file_discovery import Discovery, SeenFiles, normalize_roots
 from tesseract_setup import setup_tesseract
-from file_processing import load_keywords
-from search_engine import search_files
+from file_processing import load_matcher
+from keywords_watcher import KeywordsWatcher
+from search_engine import make_ranking, search_files, write_late_aliases, write_ranked
 from configparser import ConfigParser
 
-import fnmatch
-
 # Глобальные флаги для доступности функций
 HAS_PDF = False
 HAS_DOCX = False
@@ -53,10 +53,15 @@ class SearchApp:
         self.directories_list = []
         self.is_searching = False
         self.search_thread = None
+        self.matcher = None
+        self.keywords_watcher = None
         self.progress_value = tk.DoubleVar(value=0.0)
         self.current_file = tk.StringVar(value="")
         self.total_files = 0
         self.processed_files = 0
+        # Обход текущей директории и число файлов в уже обработанных директориях
+        self.discovery = None
+        self.discovered_before = 0
 
         # Загружаем конфигурацию ДО создания интерфейса
         self.config = self.load_configuration()
@@ -199,8 +204,11 @@ class SearchApp:
         self.dirs_listbox.insert(tk.END, default_directory)
 
         # Row 3: Options
-        options_frame = ttk.Frame(main_frame)
-        options_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=10)
+        options_container = ttk.Frame(main_frame)
+        options_container.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=10)
+
+        options_frame = ttk.Frame(options_container)
+        options_frame.pack(fill=tk.X)
 
         ttk.Label(options_frame, text="Потоки:").pack(side=tk.LEFT, padx=(0, 5))
         self.threads_var = tk.StringVar(value=str(self.config['config'].get('threads', 4)))
@@ -216,6 +224,27 @@ class SearchApp:
         ttk.Checkbutton(options_frame, text="Поиск по изображениям (OCR)",
                         variable=self.search_images_var).pack(side=tk.LEFT)
 
+        # Что пропускать при обходе директорий
+        exclude_frame = ttk.Frame(options_container)
+        exclude_frame.pack(fill=tk.X, pady=(5, 0))
+
+        ttk.Label(exclude_frame, text="Исключить (маски):").pack(side=tk.LEFT, padx=(0, 5))
+        self.exclude_globs_var = tk.StringVar(value=', '.join(self.config['config'].get('exclude_globs', [])))
+        ttk.Entry(exclude_frame, textvariable=self.exclude_globs_var, width=30).pack(side=tk.LEFT, padx=(0, 10))
+
+        ttk.Label(exclude_frame, text="Исключить пути:").pack(side=tk.LEFT, padx=(0, 5))
+        self.exclude_paths_var = tk.StringVar(value=', '.join(self.config['config'].get('exclude_paths', [])))
+        ttk.Entry(exclude_frame, textvariable=self.exclude_paths_var, width=30).pack(side=tk.LEFT, padx=(0, 10))
+
+        ttk.Label(exclude_frame, text="Глубина (0 - все):").pack(side=tk.LEFT, padx=(0, 5))
+        self.max_depth_var = tk.StringVar(value=str(self.config['config'].get('max_depth', 0)))
+        ttk.Spinbox(exclude_frame, from_=0, to=100, textvariable=self.max_depth_var, width=5).pack(side=tk.LEFT,
+                                                                                                  padx=(0, 10))
+
+        self.skip_hidden_var = tk.BooleanVar(value=self.config['config'].get('skip_hidden', False))
+        ttk.Checkbutton(exclude_frame, text="Пропускать скрытые",
+                        variable=self.skip_hidden_var).pack(side=tk.LEFT)
+
         # Row 4: Progress
         ttk.Label(main_frame, text="Прогресс:").grid(row=4, column=0, sticky=tk.W, pady=5)
 
@@ -320,7 +349,10 @@ class SearchApp:
                 if len(file_name) > 50:
                     display_name = "..." + file_name[-47:]
 
-                progress_text = f"Обработано: {self.processed_files}/{self.total_files} файлов"
+                # Пока директория обходится, общее число файлов ещё растёт
+                discovery = self.discovery
+                searching = discovery is not None and not discovery.finished
+                progress_text = f"Обработано: {self.processed_files}/{self.total_files}{'+' if searching else ''} файлов"
 
                 # Различаем разные типы сообщений
                 if file_name.startswith("Завершена обработка:"):
@@ -346,16 +378,21 @@ class SearchApp:
 
         self.root.after(0, append_result)
 
-    def count_files_to_process(self, directory, extensions):
-        """Подсчет общего количества файлов для обработки"""
-        count = 0
-        for root, _, files in os.walk(directory):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Используем fnmatch для проверки соответствия расширениям
-                if any(fnmatch.fnmatch(file, ext) for ext in extensions):
-                    count += 1
-        return count
+    def show_result(self, file_path, hits, seen, score=None):
+        """Вывод результата по одному файлу в окно и в лог"""
+        keywords = hits.keyword_summary()
+        result_text = f"Файл: {file_path}\n"
+        aliases = seen.aliases(file_path)
+        if aliases:
+            result_text += f"Другие пути: {', '.join(aliases)}\n"
+        if score is not None:
+            result_text += f"Релевантность: {score:.1f}\n"
+        result_text += f"Ключевые слова: {keywords}\n"
+        for line in hits.location_lines():
+            result_text += f"{line}\n"
+        logging.info(f"Файл: {file_path}")
+        logging.info(f"Ключевые слова: {keywords}")
+        self.add_result(result_text)
 
     def start_search(self):
         """Запуск поиска в отдельном потоке"""
@@ -392,17 +429,11 @@ class SearchApp:
             messagebox.showerror("Ошибка", "Не выбрано ни одной директории для поиска!")
             return
 
-        # Сбрасываем счетчики
+        # Сбрасываем счетчики; общее число файлов считается по ходу обхода директорий
         self.processed_files = 0
         self.total_files = 0
-
-        # Подсчитываем общее количество файлов для прогресса
-        for directory in self.directories_list:
-            self.total_files += self.count_files_to_process(directory, extensions)
-
-        if self.total_files == 0:
-            messagebox.showwarning("Предупреждение", "Не найдено файлов для обработки в указанных директориях!")
-            return
+        self.discovery = None
+        self.discovered_before = 0
 
         # Очищаем результаты и лог
         self.clear_all()
@@ -427,9 +458,15 @@ class SearchApp:
         except Exception as e:
             logging.error(f"Не удалось настроить файловое логирование: {e}")
 
-        # Загружаем ключевые слова
+        # Собираем поиск по ключевым словам один раз на весь запуск
+        # С watch_keywords изменения keywords.txt подхватываются во время поиска
         try:
-            load_keywords("keywords.txt")
+            self.keywords_watcher = None
+            if self.config['config'].get('watch_keywords'):
+                self.keywords_watcher = KeywordsWatcher("keywords.txt", self.config['config'])
+                self.matcher = self.keywords_watcher.matcher
+            else:
+                self.matcher = load_matcher("keywords.txt", self.config['config'])
         except ValueError as e:
             messagebox.showerror("Ошибка", str(e))
             return
@@ -443,7 +480,7 @@ class SearchApp:
         # Запускаем поиск в отдельном потоке
         self.search_thread = threading.Thread(
             target=self.run_search,
-            args=(extensions, self.update_progress_callback)  # Передаем callback
+            args=(extensions, self.update_progress_callback, self.matcher)  # Передаем callback и поиск
         )
         self.search_thread.daemon = True
         self.search_thread.start()
@@ -459,15 +496,26 @@ class SearchApp:
             # Принудительно обновляем статус
             self.current_file.set("Поиск остановлен пользователем")
 
-    def run_search(self, extensions, progress_callback):
+    def run_search(self, extensions, progress_callback, matcher):
         """Выполнение поиска"""
         try:
             # Сбрасываем только processed_files при начале нового поиска
             self.processed_files = 0
-            logging.info(f"Начинаем поиск. Всего файлов: {self.total_files}")
+            logging.info("Начинаем поиск")
+
+            # Вложенные и повторяющиеся директории обходятся один раз, а файл,
+            # доступный по нескольким путям, обрабатывается один раз за весь поиск
+            roots = normalize_roots(self.directories_list)
+            seen = SeenFiles(roots)
+            # Упорядочивание по релевантности и top_results - по всем директориям сразу;
+            # результаты тогда выводятся после обхода последней директории
+            ranking = make_ranking(self.config['config'])
+            output_file = self.config['config'].get('output_file') or "search_results.txt"
+            # Сколько других путей уже записано для каждого файла: повторы из следующих директорий дописываются в конце
+            reported_aliases = {}
 
             # Выполняем поиск для каждой директории с накоплением счетчика
-            for directory in self.directories_list:
+            for directory in roots:
                 if not self.is_searching:
                     logging.info("Поиск остановлен пользователем")
                     break
@@ -477,31 +525,40 @@ class SearchApp:
                 # Обновляем статус - начало обработки директории
                 self.root.after(0, lambda: self.update_progress(f"Начата обработка: {os.path.basename(directory)}"))
 
+                # Один обход директории: файлы для обработки и счётчик для прогресса
+                self.discovery = Discovery(directory, extensions, int(self.max_size_var.get()), self.config['config'],
+                                           seen)
+
                 # Используем модифицированную функцию поиска с прогрессом
                 results = search_files(
                     directory,
                     extensions,
                     int(self.threads_var.get()),
-                    "search_results.txt",
+                    output_file,
                     int(self.max_size_var.get()),
                     self.config['config'],
                     progress_callback,
-                    self.processed_files  # Передаем текущее значение как offset
+                    self.discovered_before,  # Файлы предыдущих директорий как offset
+                    matcher=matcher,
+                    watcher=self.keywords_watcher,
+                    discovery=self.discovery,
+                    ranking=ranking,
+                    reported_aliases=reported_aliases
                 )
 
                 # Показываем результаты для текущей директории
                 if results:
                     logging.info(f"Найдено совпадений в {len(results)} файлах в директории {directory}:")
-                    for file_path, keywords in results.items():
-                        result_text = f"Файл: {file_path}\nКлючевые слова: {', '.join(keywords)}\n"
-                        logging.info(f"Файл: {file_path}")
-                        logging.info(f"Ключевые слова: {', '.join(keywords)}")
-                        self.add_result(result_text)
+                    if ranking is None:
+                        for file_path, hits in results.items():
+                            self.show_result(file_path, hits, seen)
                 else:
                     logging.info(f"В директории {directory} ничего не найдено.")
 
                 # Обновляем счетчик обработанных файлов для этой директории
-                files_in_dir = self.count_files_to_process(directory, extensions)
+                files_in_dir = self.discovery.total
+                self.discovered_before += files_in_dir
+                self.discovery = None
                 logging.info(f"Обработано файлов в директории {directory}: {files_in_dir}")
 
                 # Обновляем прогресс после обработки каждой директории
@@ -510,6 +567,18 @@ class SearchApp:
                     self.root.after(0,
                                     lambda: self.update_progress(f"Завершена обработка: {os.path.basename(directory)}"))
 
+            if ranking is not None and len(ranking):
+                logging.info(f"Результаты по релевантности ({len(ranking)} файлов):")
+                for file_path, hits, score in ranking.ranked():
+                    self.show_result(file_path, hits, seen, score)
+                write_ranked(output_file, ranking, seen)
+            for file_path, aliases in write_late_aliases(output_file, reported_aliases, seen):
+                self.add_result(f"Файл: {file_path}\nДругие пути: {', '.join(aliases)}\n")
+
+            if self.is_searching and self.discovered_before == 0:
+                self.root.after(0, lambda: messagebox.showwarning(
+                    "Предупреждение", "Не найдено файлов для обработки в указанных директориях!"))
+
             # Только после ВСЕХ директорий показываем завершение поиска
             if self.is_searching:
                 logging.info("Поиск завершен!")
@@ -530,6 +599,9 @@ class SearchApp:
     def _update_progress_in_main_thread(self, file_name, processed_count):
         """Обновление прогресса в основном потоке"""
         self.processed_files = processed_count
+        discovery = self.discovery
+        if discovery is not None:
+            self.total_files = self.discovered_before + discovery.total
         self.update_progress(file_name)
 
     def on_search_finished(self):
@@ -552,12 +624,38 @@ class SearchApp:
             'keywords_file': 'keywords.txt',
             'directory': self.directories_list[0] if self.directories_list else '.',
             'threads': self.threads_var.get(),
-            'output_file': 'search_results.txt',
+            'output_file': self.config['config'].get('output_file') or 'search_results.txt',
             'search_images': 'true' if self.search_images_var.get() else 'false',
             'max_file_size': self.max_size_var.get(),
             'log_file': 'search_log.txt',
             'tesseract_languages': self.config['config'].get('tesseract_languages', 'rus'),
-            'tesseract_config': self.config['config'].get('tesseract_config', '--oem 3 --psm 6')
+            'tesseract_config': self.config['config'].get('tesseract_config', '--oem 3 --psm 6'),
+            'matcher_backend': self.config['config'].get('matcher_backend', 'auto'),
+            'scan_mode': self.config['config'].get('scan_mode', 'full'),
+            'stream_chunk_size': self.config['config'].get('stream_chunk_size', 4),
+            'collect_locations': 'true' if self.config['config'].get('collect_locations') else 'false',
+            'sort_results': 'true' if self.config['config'].get('sort_results', False) else 'false',
+            'top_results': self.config['config'].get('top_results', 0),
+            'match_mode': self.config['config'].get('match_mode', 'substring'),
+            'fuzzy_distance': self.config['config'].get('fuzzy_distance', 1),
+            'fuzzy_sources': ', '.join(self.config['config'].get('fuzzy_sources', ['ocr'])),
+            'text_folding': 'true' if self.config['config'].get('text_folding', False) else 'false',
+            'watch_keywords': 'true' if self.config['config'].get('watch_keywords') else 'false',
+            'text_cache_mb': self.config['config'].get('text_cache_mb', 256),
+            'matcher_cache_dir': self.config['config'].get('matcher_cache_dir', 'auto'),
+            'walk_threads': self.config['config'].get('walk_threads', 4),
+            'ordered_discovery': 'true' if self.config['config'].get('ordered_discovery') else 'false',
+            'exclude_globs': self.exclude_globs_var.get(),
+            'exclude_paths': self.exclude_paths_var.get(),
+            'skip_hidden': 'true' if self.skip_hidden_var.get() else 'false',
+            'max_depth': self.max_depth_var.get(),
+            'min_file_size_kb': self.config['config'].get('min_file_size_kb', 0),
+            'size_limits': ', '.join(f"{ext}:{limit}" for ext, limit in
+                                     self.config['config'].get('size_limits', {}).items()),
+            'modified_after': self.config['config'].get('modified_after', ''),
+            'modified_before': self.config['config'].get('modified_before', ''),
+            'max_age_days': self.config['config'].get('max_age_days', 0),
+            'sniff_content': 'true' if self.config['config'].get('sniff_content', True) else 'false'
         }
 
         # Сохраняем конфиг
@@ -0,0 +1,977 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
+from itertools import accumulate, chain
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from fuzzy_matching import FUZZY_SOURCES, FuzzyMatcher
+from keyword_query import KeywordQuery
+from pattern_matcher import PATTERN_CONTEXT_CHARS, PatternMatcher, glob_to_regex
+from text_normalization import compose, fold
+from tokenization import WORD_RE, TokenMatcher, TokenStream
+
+# pyahocorasick (C-расширение) используется, если установлен
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# Границы автоматического выбора алгоритма по количеству ключевых слов
+NAIVE_MAX_KEYWORDS = 128
+AHO_CORASICK_MIN_KEYWORDS = 1000
+
+BACKENDS = ('auto', 'naive', 'regex', 'aho_corasick')
+# full - читать файл целиком, any - до первого совпадения, all - пока не найдены все слова
+SCAN_MODES = ('full', 'any', 'all')
+# substring - вхождение подстроки, word - целое слово, stem - совпадение основ слов (все формы слова)
+MATCH_MODES = ('substring', 'word', 'stem')
+
+# Префиксы строк keywords.txt, задающие режим сравнения для отдельного слова.
+# re: - регулярное выражение, glob: - шаблон с * и ?, query: - логическое правило над словами;
+# в отчёте они указываются как записаны
+KEYWORD_PREFIXES = {'sub:': 'substring', 'word:': 'word', 'stem:': 'stem', 're:': 'regex', 'glob:': 'glob',
+                    'query:': 'query'}
+PATTERN_MODES = ('regex', 'glob', 'query')
+MODE_PREFIXES = {mode: prefix for prefix, mode in KEYWORD_PREFIXES.items()}
+
+# Размер блока при потоковом чтении текстовых файлов
+STREAM_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Разделитель фрагментов в scan_cells: ключевые слова - строки keywords.txt, перевода строки в них нет
+CELL_SEPARATOR = '\n'
+
+# Сбор мест совпадений: сколько мест хранить на слово и сколько символов контекста вокруг
+MAX_LOCATIONS_PER_KEYWORD = 5
+SNIPPET_RADIUS = 40
+
+
+class NaiveBackend:
+    """Проверка каждого ключевого слова через `in` - быстрее всего для коротких списков"""
+    name = 'naive'
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(keywords)
+
+    def search(self, text: str) -> Set[str]:
+        return {kw for kw in self.keywords if kw in text}
+
+    def first(self, text: str) -> Optional[str]:
+        return next((kw for kw in self.keywords if kw in text), None)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        for kw in self.keywords:
+            pos = text.find(kw)
+            while pos != -1:
+                yield pos, kw
+                pos = text.find(kw, pos + 1)
+
+    def count(self, text: str) -> Counter:
+        return Counter(kw for _, kw in self.iter_matches(text))
+
+
+def _build_trie(keywords: Iterable[str]) -> dict:
+    """Префиксное дерево: символ -> поддерево, ключ '' отмечает конец слова"""
+    trie = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return trie
+
+
+def _trie_to_pattern(node: dict, emit=re.escape) -> str:
+    """Сворачивание префиксного дерева в регулярное выражение.
+
+    Общие префиксы не повторяются, поэтому движок re проверяет в каждой позиции
+    не все слова по очереди, а только одну ветку дерева. Жадный `?` у конечных
+    узлов сохраняет предпочтение самого длинного совпадения.
+    """
+    branches = [emit(ch) + _trie_to_pattern(child, emit) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        return '(?:' + body + ')?'
+    return body
+
+
+def _prefix_map(keywords: Iterable[str], trie: dict) -> Dict[str, Tuple[str, ...]]:
+    """Для каждого слова - все ключевые слова, являющиеся его префиксами (включая само слово)"""
+    result = {}
+    for kw in keywords:
+        node = trie
+        prefixes = []
+        for i, ch in enumerate(kw, 1):
+            node = node[ch]
+            if '' in node:
+                prefixes.append(kw[:i])
+        result[kw] = tuple(prefixes)
+    return result
+
+
+class RegexBackend:
+    """Одно скомпилированное регулярное выражение на все ключевые слова.
+
+    Выражение обёрнуто в просмотр вперёд, поэтому проверяется каждая позиция
+    текста и перекрывающиеся вхождения не теряются. В позиции находится самое
+    длинное слово, более короткие слова с той же позиции - его префиксы.
+    Слова могут быть и байтовыми строками - тогда выражение ищет по bytes.
+    """
+    name = 'regex'
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(keywords)
+        binary = bool(self.keywords) and isinstance(self.keywords[0], bytes)
+        # Байты представлены символами latin-1, чтобы собирать выражение как строку
+        words = [kw.decode('latin-1') for kw in self.keywords] if binary else self.keywords
+        trie = _build_trie(words)
+        pattern = '(?=(' + _trie_to_pattern(trie) + '))'
+        if binary:
+            self._prefixes = {kw.encode('latin-1'): tuple(p.encode('latin-1') for p in prefixes)
+                              for kw, prefixes in _prefix_map(words, trie).items()}
+            self._pattern = re.compile(pattern.encode('latin-1'))
+        else:
+            self._prefixes = _prefix_map(words, trie)
+            self._pattern = re.compile(pattern)
+
+    def search(self, text: str) -> Set[str]:
+        found = set()
+        for longest in set(self._pattern.findall(text)):
+            found.update(self._prefixes[longest])
+        return found
+
+    def first(self, text: str) -> Optional[str]:
+        match = self._pattern.search(text)
+        return match.group(1) if match else None
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            for kw in self._prefixes[match.group(1)]:
+                yield start, kw
+
+    def count(self, text: str) -> Counter:
+        # Считаем самые длинные слова в позициях, затем раздаём их префиксам
+        counts = Counter()
+        for longest, n in Counter(self._pattern.findall(text)).items():
+            for kw in self._prefixes[longest]:
+                counts[kw] += n
+        return counts
+
+
+class AhoCorasickBackend:
+    """Автомат Ахо-Корасик: один проход по тексту независимо от числа слов"""
+    name = 'aho_corasick'
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(keywords)
+        binary = bool(self.keywords) and isinstance(self.keywords[0], bytes)
+        # pyahocorasick обычно собран в строковом режиме, байты ищем автоматом на Python
+        if HAS_AHOCORASICK and not binary:
+            self._automaton = ahocorasick.Automaton()
+            for kw in self.keywords:
+                self._automaton.add_word(kw, kw)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build()
+
+    def _build(self):
+        """Построение переходов, суффиксных ссылок и выходов в чистом Python"""
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[str]] = [[]]
+        for kw in self.keywords:
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(kw)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt].extend(out[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(words) for words in out]
+
+    def _iter_ends(self, text: str) -> Iterator[Tuple[int, str]]:
+        if self._automaton is not None:
+            yield from self._automaton.iter(text)
+            return
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for kw in out[state]:
+                yield i, kw
+
+    def search(self, text: str) -> Set[str]:
+        return {kw for _, kw in self._iter_ends(text)}
+
+    def first(self, text: str) -> Optional[str]:
+        return next((kw for _, kw in self._iter_ends(text)), None)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        for end, kw in self._iter_ends(text):
+            yield end - len(kw) + 1, kw
+
+    def count(self, text: str) -> Counter:
+        return Counter(kw for _, kw in self._iter_ends(text))
+
+
+def select_backend(keywords: Iterable[str], backend: str = 'auto'):
+    """Создание алгоритма поиска; при backend='auto' выбор идёт по количеству слов"""
+    keywords = sorted(set(keywords))
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный алгоритм поиска '{backend}', допустимые значения: {', '.join(BACKENDS)}")
+
+    if backend == 'auto':
+        binary = bool(keywords) and isinstance(keywords[0], bytes)
+        if len(keywords) <= NAIVE_MAX_KEYWORDS:
+            backend = 'naive'
+        elif len(keywords) >= AHO_CORASICK_MIN_KEYWORDS and HAS_AHOCORASICK and not binary:
+            backend = 'aho_corasick'
+        else:
+            # Без C-расширения (а байтовые слова оно не принимает) скомпилированное выражение
+            # быстрее автомата на чистом Python
+            backend = 'regex'
+
+    if backend == 'naive' or not keywords:
+        return NaiveBackend(keywords)
+    if backend == 'regex':
+        return RegexBackend(keywords)
+    return AhoCorasickBackend(keywords)
+
+
+def parse_keyword(entry: str, default_mode: str = 'substring') -> Tuple[str, str]:
+    """Режим сравнения и само слово из строки keywords.txt ("word:Акт" -> ('word', 'акт')).
+
+    Регулярные выражения не приводятся к нижнему регистру: это изменило бы
+    смысл классов вроде \\D и \\W. Они применяются без учёта регистра.
+    """
+    for prefix, mode in KEYWORD_PREFIXES.items():
+        if entry[:len(prefix)].lower() == prefix:
+            keyword = entry[len(prefix):].strip()
+            return mode, keyword if mode in PATTERN_MODES else keyword.lower()
+    return default_mode, entry.lower()
+
+
+# Части набора собираются через кэш: при изменении keywords.txt пересобираются
+# только те алгоритмы, чьи слова изменились (например, добавленный шаблон
+# не пересобирает автомат из 100 тысяч подстрок)
+@lru_cache(maxsize=8)
+def _literal_backend(literals: FrozenSet[str], backend: str):
+    return select_backend(literals, backend)
+
+
+@lru_cache(maxsize=8)
+def _token_matcher(words: FrozenSet[Tuple[str, str, str]]) -> Optional[TokenMatcher]:
+    return TokenMatcher(words) if words else None
+
+
+@lru_cache(maxsize=8)
+def _pattern_matcher(patterns: FrozenSet[Tuple[str, str]]) -> Optional[PatternMatcher]:
+    return PatternMatcher(patterns) if patterns else None
+
+
+@lru_cache(maxsize=8)
+def _fuzzy_matcher(keywords: FrozenSet[str], distance: int) -> Optional[FuzzyMatcher]:
+    # Пустой, если все слова слишком короткие для нечёткого поиска
+    return FuzzyMatcher(keywords, distance) or None
+
+
+@lru_cache(maxsize=8)
+def _restore_matcher(keywords: Tuple[str, ...], options: Tuple[Tuple[str, object], ...]) -> 'KeywordMatcher':
+    """Восстановление после распаковки; кэш избавляет процесс от повторной сборки"""
+    return KeywordMatcher(keywords, **dict(options))
+
+
+class KeywordMatcher:
+    """Неизменяемый скомпилированный набор ключевых слов.
+
+    Строится один раз на запуск поиска и явно передаётся во все обработчики.
+    При сериализации передаются только слова и параметры, поэтому объект
+    дёшево отправлять в пул процессов: алгоритм собирается на стороне
+    получателя один раз на процесс.
+
+    При text_folding текст и слова сравниваются в приведённом виде (см.
+    text_normalization.fold): регистр, ё/е, латинские двойники русских букв
+    и разложенная запись букв со знаками ("е" + U+0308, ударения) не мешают
+    совпадению. Шаблоны re: и glob: проверяются по тексту в нижнем
+    регистре без остальных замен, иначе изменился бы смысл классов вроде [a-z].
+    """
+    __slots__ = ('entries', 'keywords', 'backend_name', 'scan_mode', 'collect_locations', 'match_mode',
+                 'fuzzy_distance', 'fuzzy_sources', 'text_folding', 'literals', 'token_matcher', 'pattern_matcher',
+                 'fuzzy_keywords', 'fuzzy_labels', 'queries', 'query_terms', 'hidden', 'display', '_backend', '_byte_matcher',
+                 '_fuzzy_matcher')
+
+    def __init__(self, keywords: Iterable[str], backend: str = 'auto', scan_mode: str = 'full',
+                 collect_locations: bool = False, match_mode: str = 'substring', fuzzy_distance: int = 0,
+                 fuzzy_sources: Iterable[str] = ('ocr',), text_folding: bool = False):
+        if scan_mode not in SCAN_MODES:
+            raise ValueError(f"Неизвестный режим сканирования '{scan_mode}', допустимые значения: {', '.join(SCAN_MODES)}")
+        if match_mode not in MATCH_MODES:
+            raise ValueError(f"Неизвестный режим сравнения '{match_mode}', допустимые значения: {', '.join(MATCH_MODES)}")
+        fuzzy_sources = tuple(sorted(set(fuzzy_sources)))
+        unknown = set(fuzzy_sources) - set(FUZZY_SOURCES)
+        if unknown:
+            raise ValueError(f"Неизвестные источники для нечёткого поиска: {', '.join(sorted(unknown))}, "
+                             f"допустимые значения: {', '.join(FUZZY_SOURCES)}")
+        entries = frozenset(kw.strip() for kw in keywords if kw and kw.strip())
+        literals, words, patterns = set(), set(), set()
+        # Метка -> как слово записано в keywords.txt, если они различаются
+        display: Dict[str, str] = {}
+        # Слово для нечёткого поиска -> метки, которым засчитываются его вхождения
+        fuzzy_labels: Dict[str, Set[str]] = {}
+
+        def register(entry: str) -> Optional[str]:
+            """Добавление строки в нужный алгоритм поиска; возвращает метку для отчёта"""
+            mode, keyword = parse_keyword(entry, match_mode)
+            if not keyword:
+                return None
+            # Подстроки ищутся многошаблонным алгоритмом, слова и основы - по словам текста,
+            # шаблоны - одним объединённым регулярным выражением
+            if mode in ('regex', 'glob'):
+                # Шаблон в отчёте указывается так, как записан в keywords.txt
+                patterns.add((entry, glob_to_regex(keyword) if mode == 'glob' else keyword))
+                return entry
+            elif mode == 'query':
+                raise ValueError(f"Запрос не может быть словом другого запроса: '{entry}'")
+            written = keyword if mode == match_mode else MODE_PREFIXES[mode] + keyword
+            if text_folding:
+                keyword = fold(compose(keyword))
+            # Метка слов и основ включает режим: "акт" подстрокой и word:акт считаются отдельно
+            if mode == 'substring':
+                label = keyword
+                literals.add(keyword)
+            else:
+                label = MODE_PREFIXES[mode] + keyword
+                words.add((mode, keyword, label))
+            if written != label:
+                display.setdefault(label, written)
+            fuzzy_labels.setdefault(keyword, set()).add(label)
+            return label
+
+        labels, queries = set(), []
+        for entry in sorted(entries):
+            if parse_keyword(entry)[0] == 'query':
+                # Слова запроса ищутся тем же проходом, что и остальные ключевые слова
+                queries.append((entry, KeywordQuery(parse_keyword(entry)[1], register)))
+                labels.add(entry)
+            else:
+                label = register(entry)
+                if label:
+                    labels.add(label)
+        query_terms = frozenset().union(*(query.terms for _, query in queries))
+        literals = frozenset(literals)
+        object.__setattr__(self, 'entries', entries)
+        object.__setattr__(self, 'keywords', frozenset(labels))
+        object.__setattr__(self, 'queries', tuple(queries))
+        object.__setattr__(self, 'query_terms', query_terms)
+        # Слова, которые есть только в запросах, ищутся, но в отчёт сами не попадают
+        object.__setattr__(self, 'hidden', query_terms - labels)
+        object.__setattr__(self, 'display', display)
+        object.__setattr__(self, 'text_folding', text_folding)
+        object.__setattr__(self, 'backend_name', backend)
+        object.__setattr__(self, 'scan_mode', scan_mode)
+        object.__setattr__(self, 'collect_locations', collect_locations)
+        object.__setattr__(self, 'match_mode', match_mode)
+        object.__setattr__(self, 'literals', literals)
+        object.__setattr__(self, 'token_matcher', _token_matcher(frozenset(words)))
+        object.__setattr__(self, 'pattern_matcher', _pattern_matcher(frozenset(patterns)))
+        object.__setattr__(self, 'fuzzy_distance', fuzzy_distance)
+        object.__setattr__(self, 'fuzzy_sources', fuzzy_sources)
+        # Нечётко ищутся обычные слова; шаблоны и так задают допустимые варианты.
+        # Сам алгоритм строится при первом тексте из fuzzy_sources
+        if not fuzzy_distance or not fuzzy_sources:
+            fuzzy_labels = {}
+        object.__setattr__(self, 'fuzzy_keywords', frozenset(fuzzy_labels))
+        object.__setattr__(self, 'fuzzy_labels', {keyword: tuple(sorted(labels))
+                                                  for keyword, labels in fuzzy_labels.items()})
+        object.__setattr__(self, '_backend', _literal_backend(literals, backend))
+        object.__setattr__(self, '_byte_matcher', None)
+        object.__setattr__(self, '_fuzzy_matcher', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KeywordMatcher нельзя изменять после создания")
+
+    def __reduce__(self):
+        return _restore_matcher, (tuple(sorted(self.entries)), self.options)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Полное состояние вместе с собранными алгоритмами - для кэша на диске (см. matcher_cache).
+
+        В отличие от сериализации для пула процессов, после загрузки ничего
+        не собирается заново (кроме компиляции регулярных выражений).
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, object]) -> 'KeywordMatcher':
+        matcher = object.__new__(cls)
+        for name in cls.__slots__:
+            object.__setattr__(matcher, name, state[name])
+        return matcher
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def __repr__(self) -> str:
+        return f"KeywordMatcher({len(self.keywords)} слов, алгоритм={self.algorithm}, режим={self.scan_mode})"
+
+    @property
+    def options(self) -> Tuple[Tuple[str, object], ...]:
+        """Параметры сборки в виде, пригодном для ключа кэша"""
+        return (
+            ('backend', self.backend_name),
+            ('scan_mode', self.scan_mode),
+            ('collect_locations', self.collect_locations),
+            ('match_mode', self.match_mode),
+            ('fuzzy_distance', self.fuzzy_distance),
+            ('fuzzy_sources', self.fuzzy_sources),
+            ('text_folding', self.text_folding),
+        )
+
+    def rebuilt(self, entries: Iterable[str]) -> 'KeywordMatcher':
+        """Набор с теми же параметрами по другим строкам keywords.txt.
+
+        Неизменившиеся алгоритмы берутся из кэша, а не собираются заново.
+        """
+        return _restore_matcher(tuple(sorted(set(entries))), self.options)
+
+    def fuzzy_for(self, source: str):
+        """Нечёткий поиск, если он включён для этого источника текста"""
+        if self.fuzzy_keywords and source in self.fuzzy_sources:
+            return self.fuzzy_matcher
+        return None
+
+    @property
+    def fuzzy_matcher(self) -> Optional[FuzzyMatcher]:
+        """Нечёткий поиск; строится при первом обращении"""
+        if self._fuzzy_matcher is None and self.fuzzy_keywords:
+            object.__setattr__(self, '_fuzzy_matcher', _fuzzy_matcher(self.fuzzy_keywords, self.fuzzy_distance))
+        return self._fuzzy_matcher
+
+    @property
+    def text_matchers(self) -> tuple:
+        """Поиск по словам и шаблонам - всё, что требует декодированного текста"""
+        return tuple(m for m in (self.token_matcher, self.pattern_matcher) if m is not None)
+
+    @property
+    def algorithm(self) -> str:
+        """Фактически выбранный алгоритм поиска"""
+        parts = [self._backend.name] if self.literals else []
+        if self.token_matcher is not None:
+            parts.append(self.token_matcher.name)
+        if self.pattern_matcher is not None:
+            parts.append(self.pattern_matcher.name)
+        return ' + '.join(parts) or self._backend.name
+
+    @property
+    def byte_matcher(self):
+        """Поиск по сырым байтам; строится при первом обращении"""
+        if self._byte_matcher is None:
+            from byte_matcher import ByteMatcher
+            object.__setattr__(self, '_byte_matcher', ByteMatcher(self.literals, self.backend_name))
+        return self._byte_matcher
+
+    def fold(self, text: str) -> str:
+        """Текст в том виде, в котором он сравнивается с ключевыми словами"""
+        return fold(compose(text)) if self.text_folding else text.lower()
+
+    def label(self, keyword: str) -> str:
+        """Ключевое слово так, как оно записано в keywords.txt (префикс режима - если он не по умолчанию)"""
+        return self.display.get(keyword, keyword)
+
+    def _prepared(self, text: str, literals: bool = True) -> List[Tuple[object, str]]:
+        """Алгоритмы поиска вместе с подготовленным для каждого текстом.
+
+        Текст приводится один раз на буфер; шаблонам при text_folding нужен
+        свой вариант - только в нижнем регистре.
+        """
+        folded = self.fold(text)
+        prepared = [(self._backend, folded)] if literals else []
+        if self.token_matcher is not None:
+            prepared.append((self.token_matcher, folded))
+        if self.pattern_matcher is not None:
+            prepared.append((self.pattern_matcher, text.lower() if self.text_folding else folded))
+        return prepared
+
+    def search(self, text: str) -> Set[str]:
+        """Все ключевые слова, встречающиеся в тексте"""
+        if not text:
+            return set()
+        found = set()
+        for matcher, prepared in self._prepared(text):
+            found |= matcher.search(prepared)
+        if self.queries:
+            # Без позиций слов запросы с WITHIN проверяются по всему тексту
+            found.update(label for label, query in self.queries if query.evaluate(found))
+            found -= self.hidden
+        return found
+
+    def first(self, text: str) -> Optional[str]:
+        """Любое одно найденное ключевое слово или None"""
+        if not text:
+            return None
+        for matcher, prepared in self._prepared(text):
+            keyword = matcher.first(prepared)
+            if keyword is not None:
+                return keyword
+        return None
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Пары (позиция, ключевое слово) для всех вхождений, включая перекрывающиеся"""
+        if not text:
+            return iter(())
+        return chain.from_iterable(matcher.iter_matches(prepared) for matcher, prepared in self._prepared(text))
+
+    def iter_spans(self, text: str, literals: bool = True) -> Iterator[Tuple[int, int, str]]:
+        """Тройки (начало, конец, ключевое слово) для всех вхождений.
+
+        literals=False - только слова и шаблоны (подстроки уже найдены по байтам).
+        """
+        if not text:
+            return
+        for matcher, prepared in self._prepared(text, literals):
+            if matcher is self._backend:
+                for start, keyword in matcher.iter_matches(prepared):
+                    yield start, start + len(keyword), keyword
+            else:
+                yield from matcher.iter_spans(prepared)
+
+    def count(self, text: str) -> Counter:
+        """Число вхождений каждого найденного ключевого слова, включая перекрывающиеся"""
+        counts = Counter()
+        if not text:
+            return counts
+        for matcher, prepared in self._prepared(text):
+            counts.update(matcher.count(prepared))
+        return counts
+
+
+def _crosses_cell(ends: List[int], start: int, end: int) -> bool:
+    """Совпадение начинается в одном фрагменте блока, а заканчивается за его концом"""
+    return end > ends[bisect_right(ends, start)] - len(CELL_SEPARATOR)
+
+
+def _cell_start(ends: List[int], end: int) -> int:
+    """Начало фрагмента блока, в котором заканчивается совпадение"""
+    cell = bisect_right(ends, end - 1)
+    return ends[cell - 1] if cell else 0
+
+
+class Hit(NamedTuple):
+    """Место совпадения в файле и фрагмент текста вокруг него"""
+    location: str
+    snippet: str
+
+
+def _snippet(text: str, start: int, length: int) -> str:
+    fragment = text[max(0, start - SNIPPET_RADIUS):start + length + SNIPPET_RADIUS]
+    return ' '.join(fragment.split())
+
+
+class FileHits:
+    """Совпадения по одному файлу.
+
+    Обработчики передают сюда каждый извлечённый фрагмент текста и проверяют
+    `done` во внутренних циклах: в режиме 'any' файл заканчивается на первом
+    совпадении, в режиме 'all' - когда найдены все ключевые слова.
+
+    Если в matcher включён сбор мест совпадений, для каждого слова запоминается
+    до MAX_LOCATIONS_PER_KEYWORD мест с фрагментом текста - в том же проходе,
+    без повторного чтения файла.
+
+    counts - число вхождений каждого слова, scanned - объём просмотренного
+    текста (символы или байты); по ним считается релевантность файла.
+    В режимах 'any' и 'all' счётчики неполные: чтение прекращается раньше.
+
+    Если в matcher есть запросы, для их слов запоминаются номера слов файла,
+    где они встретились; сами запросы вычисляются в finish().
+
+    С record=True переданный текст запоминается в segments, чтобы потом
+    проверить его на другие слова через replay() без повторного извлечения.
+    Потоки не запоминаются: после scan_stream segments - None.
+    """
+    __slots__ = ('matcher', 'found', 'counts', 'scanned', 'locations', 'segments', '_prefix', '_positions',
+                 '_word_offset')
+
+    def __init__(self, matcher: 'KeywordMatcher', record: bool = False):
+        self.matcher = matcher
+        self.segments: Optional[List[tuple]] = [] if record else None
+        self.found: Set[str] = set()
+        self.counts: Counter = Counter()
+        self.scanned = 0
+        self.locations: Dict[str, List[Hit]] = {}
+        self._prefix = ''
+        # Номера слов файла, где встретились слова запросов, и число уже просмотренных слов
+        self._positions: Dict[str, List[int]] = {}
+        self._word_offset = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.found)
+
+    @property
+    def done(self) -> bool:
+        """Дальнейшее чтение файла уже не изменит результат"""
+        mode = self.matcher.scan_mode
+        if mode == 'any':
+            return bool(self.found)
+        if mode == 'all':
+            if len(self.found) >= len(self.matcher.keywords):
+                return True
+            # Остались только запросы - они проверяются по уже собранным позициям
+            if self.matcher.queries and len(self.found) + len(self.matcher.queries) >= len(self.matcher.keywords):
+                return self._settle_queries()
+        return False
+
+    def _settle_queries(self) -> bool:
+        """Учёт запросов, которые уже истинны и не станут ложными; True, если учтены все.
+
+        Запрос с NOT может стать ложным от дальнейшего текста, поэтому
+        в режиме 'all' он не даёт закончить чтение файла раньше.
+        """
+        for label, query in self.matcher.queries:
+            if label in self.found:
+                continue
+            if not query.monotone or not query.matches(self._positions, self._word_offset):
+                return False
+            self.found.add(label)
+            self.counts[label] += 1
+        return True
+
+    @contextmanager
+    def within(self, part: str):
+        """Места совпадений внутри блока получают префикс (например, файл внутри архива)"""
+        previous = self._prefix
+        self._prefix = f"{previous}{part} / "
+        try:
+            yield
+        finally:
+            self._prefix = previous
+
+    @property
+    def total(self) -> int:
+        """Общее число вхождений всех ключевых слов"""
+        return sum(self.counts.values())
+
+    def keyword_summary(self) -> str:
+        """Найденные слова с числом вхождений, самые частые первыми"""
+        ranked = sorted(self.found, key=lambda kw: (-self.counts[kw], kw))
+        return ', '.join(f"{self.matcher.label(kw)} ({self.counts[kw]})" for kw in ranked)
+
+    def location_lines(self) -> List[str]:
+        """Строки отчёта о местах совпадений: слово, место и фрагмент текста"""
+        return [f"  {self.matcher.label(keyword)} - {hit.location}: ...{hit.snippet}..."
+                for keyword in sorted(self.locations) for hit in self.locations[keyword]]
+
+    def finish(self) -> None:
+        """Вычисление запросов по собранным позициям; вызывается после обработки файла целиком"""
+        for label, query in self.matcher.queries:
+            if label not in self.found and query.matches(self._positions, self._word_offset):
+                self.found.add(label)
+                self.counts[label] += 1
+
+    def replay(self, segments: List[tuple]) -> None:
+        """Повторный поиск по тексту, запомненному другим FileHits (см. record)"""
+        previous = self._prefix
+        try:
+            for kind, prefix, text, location, source in segments:
+                self._prefix = prefix
+                if kind == 'cells':
+                    self.scan_cells(text, location, source)
+                else:
+                    self.scan(text, location, source)
+                if self.done:
+                    break
+        finally:
+            self._prefix = previous
+
+    def merged(self, matcher: 'KeywordMatcher', extra: Optional['FileHits'] = None) -> 'FileHits':
+        """Совпадения для нового набора слов: свои без удалённых слов и совпадения extra по добавленным"""
+        result = FileHits(matcher)
+        result.scanned = self.scanned
+        for hits in (self, extra):
+            if hits is None:
+                continue
+            for keyword in hits.found & matcher.keywords:
+                result.found.add(keyword)
+                result.counts[keyword] += hits.counts[keyword]
+                if keyword in hits.locations:
+                    result.locations.setdefault(keyword, []).extend(hits.locations[keyword])
+        return result
+
+    def _wants_location(self, keyword: str) -> bool:
+        return len(self.locations.get(keyword, ())) < MAX_LOCATIONS_PER_KEYWORD
+
+    def _add_location(self, keyword: str, location: str, snippet: str) -> None:
+        self.locations.setdefault(keyword, []).append(Hit(self._prefix + location, snippet))
+
+    def _record(self, keyword: str, start: int, end: int, text: str, where: Callable[[int], str],
+                word_starts: Optional[List[int]], ends: Optional[List[int]] = None) -> None:
+        """Учёт одного вхождения: позиция для запросов, счётчик и место совпадения.
+
+        ends - концы фрагментов блока (scan_cells): фрагмент текста вокруг
+        совпадения не выходит за свою ячейку.
+        """
+        if word_starts is not None and keyword in self.matcher.query_terms:
+            word = max(bisect_right(word_starts, start) - 1, 0)
+            self._positions.setdefault(keyword, []).append(self._word_offset + word)
+        if keyword in self.matcher.hidden:
+            return
+        self.found.add(keyword)
+        self.counts[keyword] += 1
+        if self.matcher.collect_locations and self._wants_location(keyword):
+            location, length = where(start), end - start
+            if ends is not None:
+                cell = bisect_right(ends, start)
+                first = ends[cell - 1] if cell else 0
+                text, start = text[first:ends[cell] - len(CELL_SEPARATOR)], start - first
+            self._add_location(keyword, location, _snippet(text, start, length))
+
+    def scan(self, text: str, location: str = None, source: str = 'text') -> None:
+        """Поиск ключевых слов во фрагменте текста.
+
+        location - где этот фрагмент в файле, source - откуда текст ('ocr', 'pdf',
+        'docx', 'excel'); по источнику решается, нужен ли нечёткий поиск.
+        """
+        if self.segments is not None and text:
+            self.segments.append(('text', self._prefix, text, location, source))
+        if not text or self.done:
+            return
+        if self.matcher.text_folding:
+            # Места совпадений считаются в тексте, где знаки уже собраны в буквы (см. compose)
+            text = compose(text)
+        self.scanned += len(text)
+        self._scan(text, (lambda pos: location) if location else (lambda pos: f"символ {pos}"), source)
+
+    def scan_cells(self, cells: Sequence[str], locations: Optional[Sequence[str]] = None,
+                   source: str = 'excel') -> None:
+        """Поиск в блоке коротких фрагментов (ячеек таблицы) за один вызов.
+
+        Фрагменты склеиваются через CELL_SEPARATOR и просматриваются одним
+        проходом; каждое совпадение относится к фрагменту, где оно началось.
+        Совпадения, которые заходят за конец своего фрагмента, отбрасываются:
+        по отдельности такой текст не нашёлся бы. locations - место каждого
+        фрагмента в файле, если собираются места совпадений.
+        """
+        if self.segments is not None and cells:
+            self.segments.append(('cells', self._prefix, list(cells), locations, source))
+        if not cells or self.done:
+            return
+        if self.matcher.text_folding:
+            cells = [compose(cell) for cell in cells]
+        text = CELL_SEPARATOR.join(cells)
+        self.scanned += len(text) - len(cells) + 1
+        # Конец каждого фрагмента вместе с разделителем после него
+        ends = list(accumulate(len(cell) + len(CELL_SEPARATOR) for cell in cells))
+        if locations is not None:
+            where = lambda pos: locations[bisect_right(ends, pos)]
+        else:
+            where = lambda pos: f"ячейка {bisect_right(ends, pos) + 1}"
+        self._scan(text, where, source, ends)
+
+    def _scan(self, text: str, where: Callable[[int], str], source: str, ends: Optional[List[int]] = None) -> None:
+        exact = Counter()
+        word_starts = None
+        if self.matcher.collect_locations or self.matcher.queries or ends is not None:
+            if self.matcher.queries:
+                word_starts = [match.start() for match in WORD_RE.finditer(text)]
+            for start, end, keyword in self.matcher.iter_spans(text):
+                if ends is not None and _crosses_cell(ends, start, end):
+                    continue
+                exact[keyword] += 1
+                self._record(keyword, start, end, text, where, word_starts, ends)
+                if self.done:
+                    return
+        elif self.matcher.scan_mode == 'any':
+            keyword = self.matcher.first(text)
+            if keyword is not None:
+                self.found.add(keyword)
+                self.counts[keyword] += 1
+                return
+        else:
+            exact = self.matcher.count(text)
+            self.counts.update(exact)
+            self.found.update(exact)
+
+        fuzzy = self.matcher.fuzzy_for(source)
+        if fuzzy is not None and not self.done:
+            self._scan_fuzzy(fuzzy, text, where, exact, word_starts, ends)
+        if word_starts is not None:
+            self._word_offset += len(word_starts)
+
+    def _scan_fuzzy(self, fuzzy, text: str, where: Callable[[int], str], exact: Counter,
+                    word_starts: Optional[List[int]], ends: Optional[List[int]]) -> None:
+        """Нечёткий поиск; точные вхождения он тоже находит, поэтому к счётчику добавляется только разница"""
+        folded = self.matcher.fold(text)
+        if self.matcher.scan_mode == 'any' and not self.matcher.queries and ends is None:
+            keyword = fuzzy.first(folded)
+            if keyword is not None:
+                label = self.matcher.fuzzy_labels[keyword][0]
+                self.found.add(label)
+                self.counts[label] += 1
+            return
+        approximate = Counter()
+        for start, end, keyword in fuzzy.iter_spans(folded):
+            if ends is not None:
+                # Начало нечёткого совпадения приблизительное и может попасть в предыдущую ячейку.
+                # Тогда совпадение проверяется по тексту ячейки, где оно заканчивается: по отдельности
+                # в ней оно тоже должно найтись
+                first = _cell_start(ends, end)
+                if start < first:
+                    if not fuzzy.ends_at_end(folded[first:end], keyword):
+                        continue
+                    start = first
+                if _crosses_cell(ends, start, end):
+                    continue
+            for label in self.matcher.fuzzy_labels[keyword]:
+                approximate[label] += 1
+                if approximate[label] <= exact[label]:
+                    continue
+                # Нечёткое вхождение сверх точных учитывается как обычное, с пометкой в месте совпадения
+                self._record(label, start, end, text, lambda pos: f"{where(pos)} (нечётко)", word_starts, ends)
+                if self.done:
+                    return
+
+    def _scan_buffer(self, data: bytes, encodings: Tuple[str, ...], offset: int, tail: int, line: int) -> None:
+        byte_matcher = self.matcher.byte_matcher
+        self.scanned += len(data) - tail
+        if self.matcher.collect_locations:
+            for start, end, keyword, encoding in byte_matcher.iter_matches(data, encodings, offset):
+                if end <= tail:
+                    # Совпадение целиком в перенесённом хвосте уже учтено в прошлом блоке
+                    continue
+                self.found.add(keyword)
+                self.counts[keyword] += 1
+                if self._wants_location(keyword):
+                    # Окно в байтах: кириллица в UTF-8 и UTF-16 занимает два байта на символ.
+                    # Левая граница сохраняет чётность совпадения, чтобы UTF-16 декодировался ровно
+                    radius = SNIPPET_RADIUS if encoding == 'cp1251' else SNIPPET_RADIUS * 2
+                    left = min(start, radius) & ~1
+                    window = data[start - left:end + radius].decode(encoding, errors='ignore')
+                    line_number = line + data.count(b'\n', 0, start)
+                    self._add_location(keyword, f"строка {line_number}, байт {offset + start}",
+                                       ' '.join(window.split()))
+                if self.done:
+                    return
+        elif self.matcher.scan_mode == 'any':
+            keyword = byte_matcher.first(data, encodings, offset)
+            if keyword is not None:
+                self.found.add(keyword)
+                self.counts[keyword] += 1
+        else:
+            counts = byte_matcher.count(data, encodings, offset, tail)
+            self.counts.update(counts)
+            self.found.update(counts)
+
+    def _scan_window(self, window: Optional[Tuple[str, int, int]], everything: bool) -> None:
+        """Поиск в окне декодированного потока (текст, owned, номер первой строки).
+
+        everything - искать все ключевые слова, а не только слова и шаблоны
+        (поиск по байтам не используется).
+        """
+        if window is None:
+            return
+        text, owned, line = window
+        if self.matcher.text_folding:
+            # Своя часть окна и перенесённая собираются отдельно, чтобы граница между ними не сдвинулась
+            head = compose(text[:owned])
+            text, owned = head + compose(text[owned:]), len(head)
+        word_starts = None
+        if self.matcher.queries:
+            word_starts = [match.start() for match in WORD_RE.finditer(text)]
+        if everything:
+            self.scanned += owned
+        spans = self.matcher.iter_spans(text, literals=everything)
+
+        def where(pos: int) -> str:
+            return f"строка {line + text.count(chr(10), 0, pos)}"
+
+        for start, end, keyword in spans:
+            if start >= owned:
+                # Начало в перенесённой части - совпадение достанется следующему окну
+                continue
+            self._record(keyword, start, end, text, where, word_starts)
+            if self.done:
+                return
+        if word_starts is not None:
+            self._word_offset += bisect_left(word_starts, owned)
+
+    def scan_stream(self, stream: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+        """Поиск ключевых слов в текстовом потоке без декодирования и чтения целиком.
+
+        Поток читается блоками фиксированного размера; хвост предыдущего блока
+        длиной в самое длинное ключевое слово переносится в следующий, поэтому
+        совпадения на границе блоков не теряются, а память не зависит от
+        размера файла.
+
+        Слова, которые сравниваются не как подстроки (например, по основам),
+        и шаблоны ищутся в декодированном тексте: те же блоки дополнительно
+        декодируются с переносом незаконченного слова в следующий блок.
+        Запросам нужны номера слов, а приведению текста (text_folding) -
+        сами символы, поэтому при них декодируется и ищется в тексте всё.
+        """
+        from byte_matcher import PROBE_SIZE, detect_encodings, text_encoding
+        self.segments = None
+        if self.done:
+            return
+        buffer = stream.read(max(chunk_size, PROBE_SIZE))
+        if not buffer:
+            return
+        encodings = detect_encodings(buffer[:PROBE_SIZE])
+        everything = bool(self.matcher.queries) or (self.matcher.text_folding and bool(self.matcher.literals))
+        words = None
+        if self.matcher.text_matchers or everything:
+            tokens, patterns = self.matcher.token_matcher, self.matcher.pattern_matcher
+            # Перенос между окнами вмещает фразу, совпадение шаблона и левый контекст фрагмента
+            context_chars = max(PATTERN_CONTEXT_CHARS if patterns else 0,
+                                SNIPPET_RADIUS if self.matcher.collect_locations else 0,
+                                max(map(len, self.matcher.literals), default=0) if everything else 0)
+            words = TokenStream(tokens.max_phrase_words if tokens else 1, text_encoding(buffer[:PROBE_SIZE]),
+                                context_chars)
+        overlap = 0 if everything else self.matcher.byte_matcher.max_needle_length - 1
+        offset = 0
+        tail = b''
+        line = 1
+        new_data = buffer
+        while True:
+            if not everything:
+                self._scan_buffer(buffer, encodings, offset, len(tail), line)
+            if words is not None and not self.done:
+                self._scan_window(words.feed(new_data), everything)
+            if self.done:
+                return
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                if words is not None:
+                    self._scan_window(words.feed(b'', final=True), everything)
+                return
+            new_data = chunk
+            tail = buffer[len(buffer) - overlap:] if overlap > 0 else b''
+            consumed = len(buffer) - len(tail)
+            if self.matcher.collect_locations:
+                line += buffer.count(b'\n', 0, consumed)
+            offset += consumed
+            buffer = tail + chunk
@@ -0,0 +1,215 @@
+import re
+from collections import Counter
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+# Операторы запроса; русские синонимы допускаются наравне с английскими
+_OPERATORS = {
+    'and': 'and', 'и': 'and',
+    'or': 'or', 'или': 'or',
+    'not': 'not', 'не': 'not',
+    'within': 'within',
+}
+_UNITS = ('words', 'word', 'слов', 'слова', 'слово')
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    """Разбиение запроса на пары (вид, значение): '(' ')', 'op', 'term', 'number'"""
+    tokens = []
+    pos = 0
+    query = query.rstrip()
+    while pos < len(query):
+        match = _TOKEN_RE.match(query, pos)
+        if not match:
+            raise ValueError(f"непарная кавычка в позиции {pos}")
+        pos = match.end()
+        opening, closing, quoted, bare = match.groups()
+        if opening:
+            tokens.append(('(', opening))
+        elif closing:
+            tokens.append((')', closing))
+        elif quoted is not None:
+            tokens.append(('term', quoted))
+        elif bare.lower() in _OPERATORS:
+            tokens.append(('op', _OPERATORS[bare.lower()]))
+        else:
+            tokens.append(('term', bare))
+    return tokens
+
+
+class _Parser:
+    """Рекурсивный спуск: or -> and -> not -> ( or ) | слово.
+
+    Слова подряд без оператора и "A NOT B" понимаются как AND.
+    """
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError("запрос неожиданно закончился")
+        self.pos += 1
+        return token
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == ('op', 'or'):
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while True:
+            kind, value = self.peek()
+            if kind == 'op' and value == 'and':
+                self.take()
+            elif not (kind in ('(', 'term') or (kind == 'op' and value == 'not')):
+                return node
+            node = ('and', node, self.parse_not())
+
+    def parse_not(self):
+        if self.peek() == ('op', 'not'):
+            self.take()
+            return ('not', self.parse_not())
+        kind, value = self.take()
+        if kind == '(':
+            node = self.parse_or()
+            if self.take()[0] != ')':
+                raise ValueError("не хватает закрывающей скобки")
+            return node
+        if kind == 'term':
+            return ('term', value)
+        raise ValueError(f"неожиданное '{value}'")
+
+
+def _tree_terms(node) -> List[str]:
+    """Слова запроса в порядке записи"""
+    if node[0] == 'term':
+        return [node[1]]
+    return [term for child in node[1:] for term in _tree_terms(child)]
+
+
+def _tree_kinds(node) -> Set[str]:
+    """Виды узлов дерева запроса"""
+    if node[0] == 'term':
+        return {'term'}
+    return {node[0]}.union(*(_tree_kinds(child) for child in node[1:]))
+
+
+def _compile(node, labels: Dict[str, str]) -> Callable[[Set[str]], bool]:
+    """Дерево запроса в функцию от множества присутствующих слов"""
+    kind = node[0]
+    if kind == 'term':
+        label = labels[node[1]]
+        return lambda present: label in present
+    if kind == 'not':
+        operand = _compile(node[1], labels)
+        return lambda present: not operand(present)
+    left = _compile(node[1], labels)
+    right = _compile(node[2], labels)
+    if kind == 'and':
+        return lambda present: left(present) and right(present)
+    return lambda present: left(present) or right(present)
+
+
+class KeywordQuery:
+    """Логическое правило над ключевыми словами: AND, OR, NOT, скобки и WITHIN N.
+
+    Пример: контракт AND (поставка OR договор) NOT образец WITHIN 50 WORDS.
+    Слова запроса - обычные строки keywords.txt (можно с префиксами word:,
+    stem:, re: и т.д., фразы - в кавычках). Запрос не ищет текст сам:
+    он вычисляется по позициям слов, собранным тем же проходом по файлу,
+    что и обычные ключевые слова.
+
+    Без WITHIN правило проверяется по всему файлу. С WITHIN N - по каждому
+    отрезку из N слов подряд; NOT тогда означает "нигде в этом отрезке" -
+    ни до, ни между, ни после остальных слов запроса.
+    """
+    __slots__ = ('source', 'within', 'terms', 'monotone', '_tree', '_labels', '_evaluate')
+
+    def __init__(self, source: str, parse_term: Callable[[str], str]):
+        """parse_term - разбор слова запроса в метку, под которой оно ищется"""
+        self.source = source
+        try:
+            tokens = _tokenize(source)
+            self.within = None
+            if len(tokens) >= 2 and tokens[-1][0] == 'term' and tokens[-1][1].lower() in _UNITS:
+                tokens = tokens[:-1]
+            if len(tokens) >= 2 and tokens[-2] == ('op', 'within'):
+                if not tokens[-1][1].isdigit() or int(tokens[-1][1]) < 1:
+                    raise ValueError("после WITHIN нужно положительное число слов")
+                self.within = int(tokens[-1][1])
+                tokens = tokens[:-2]
+            parser = _Parser(tokens)
+            tree = parser.parse_or()
+            if parser.pos != len(tokens):
+                raise ValueError(f"лишнее '{tokens[parser.pos][1]}'")
+            labels = {term: None for term in _tree_terms(tree)}
+            for term in labels:
+                labels[term] = parse_term(term)
+        except ValueError as e:
+            raise ValueError(f"Ошибка в запросе '{source}': {e}")
+        self._setup(tree, labels)
+
+    def _setup(self, tree, labels: Dict[str, str]) -> None:
+        self._tree = tree
+        self._labels = labels
+        self.terms: FrozenSet[str] = frozenset(labels.values())
+        # Без NOT истинное правило не станет ложным от дальнейшего текста файла
+        self.monotone = 'not' not in _tree_kinds(tree)
+        self._evaluate = _compile(tree, labels)
+
+    def __getstate__(self):
+        # Скомпилированное правило - замыкания, они не сериализуются и собираются заново из дерева
+        return self.source, self.within, self._tree, self._labels
+
+    def __setstate__(self, state) -> None:
+        self.source, self.within, tree, labels = state
+        self._setup(tree, labels)
+
+    def evaluate(self, present: Set[str]) -> bool:
+        """Истинность правила при данном множестве встретившихся слов"""
+        return self._evaluate(present)
+
+    def matches(self, positions: Dict[str, Sequence[int]], words: int = 0) -> bool:
+        """Проверка по позициям (номерам слов в файле) вхождений слов запроса.
+
+        words - число слов в файле: отрезки WITHIN не выходят за его конец,
+        а файл короче N слов проверяется целиком.
+        """
+        present = {term for term in self.terms if positions.get(term)}
+        if self.within is None:
+            return self.evaluate(present)
+
+        events = sorted((pos, term) for term in present for pos in positions[term])
+        if not events:
+            return self.evaluate(set())
+        # Слова в отрезке [start, start + N) меняются, только когда вхождение входит в отрезок
+        # (start = pos - N + 1) или выходит из него (start = pos + 1); между этими точками
+        # отрезки равнозначны, поэтому проверяется по одному отрезку на каждую
+        last_start = max(0, max(words, events[-1][0] + 1) - self.within)
+        changes = [pos - self.within + 1 for pos, _ in events] + [pos + 1 for pos, _ in events]
+        starts = sorted({0, last_start} | {min(max(start, 0), last_start) for start in changes})
+        window: Counter = Counter()
+        entered = left = 0
+        for start in starts:
+            while entered < len(events) and events[entered][0] < start + self.within:
+                window[events[entered][1]] += 1
+                entered += 1
+            while left < entered and events[left][0] < start:
+                term = events[left][1]
+                window[term] -= 1
+                if not window[term]:
+                    del window[term]
+                left += 1
+            if self.evaluate(window.keys()):
+                return True
+        return False
@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from file_processing import load_matcher
+from keyword_matcher import KeywordMatcher
+
+# Как часто проверять, не изменился ли файл ключевых слов (секунды)
+KEYWORDS_POLL_INTERVAL = 2.0
+
+
+class ExtractedTextCache:
+    """Текст, извлечённый из обработанных файлов (PDF, DOCX, OCR, Excel).
+
+    Нужен, чтобы после добавления ключевых слов проверить уже обработанные
+    файлы только на новые слова, не извлекая текст заново. Объём ограничен:
+    при переполнении вытесняются давно добавленные файлы, и они при
+    необходимости обрабатываются заново. Запись хранится вместе со временем
+    изменения файла и не используется, если файл с тех пор изменился.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max(max_chars, 0)
+        self._entries: 'OrderedDict[str, Tuple[float, int, List[tuple]]]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _segments_size(segments: List[tuple]) -> int:
+        return sum(len(text) if kind == 'text' else sum(map(len, text))
+                   for kind, _, text, _, _ in segments)
+
+    def put(self, path: str, segments: List[tuple]) -> None:
+        size = self._segments_size(segments)
+        if size > self.max_chars:
+            return
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        with self._lock:
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[path] = (mtime, size, segments)
+            self._size += size
+            while self._size > self.max_chars:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def get(self, path: str) -> Optional[List[tuple]]:
+        """Запомненный текст файла или None, если его нет или файл изменился"""
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            return None
+        try:
+            if os.path.getmtime(path) != entry[0]:
+                return None
+        except OSError:
+            return None
+        return entry[2]
+
+
+class KeywordsWatcher:
+    """Слежение за файлом ключевых слов во время поиска.
+
+    current() отдаёт актуальный набор ключевых слов: не чаще раза в interval
+    секунд проверяется время изменения и размер файла, и при изменении набор
+    пересобирается (неизменившиеся алгоритмы берутся из кэша, см.
+    KeywordMatcher.rebuilt). Обработчики берут набор перед каждым файлом,
+    поэтому долгий поиск переходит на новые слова между файлами. Если новый
+    файл не разбирается, остаётся прежний набор.
+    """
+
+    def __init__(self, keywords_file: str, config: dict, interval: float = KEYWORDS_POLL_INTERVAL):
+        self.keywords_file = keywords_file
+        self.config = config
+        self.interval = interval
+        self.matcher: KeywordMatcher = load_matcher(keywords_file, config)
+        self.text_cache = ExtractedTextCache(config.get('text_cache_mb', 256) * 1024 * 1024)
+        self._stamp = self._file_stamp()
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _file_stamp(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.keywords_file)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def current(self) -> KeywordMatcher:
+        """Актуальный набор ключевых слов"""
+        if time.monotonic() - self._checked < self.interval:
+            return self.matcher
+        with self._lock:
+            if time.monotonic() - self._checked < self.interval:
+                return self.matcher
+            self._checked = time.monotonic()
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._stamp:
+                return self.matcher
+            self._stamp = stamp
+            try:
+                matcher = load_matcher(self.keywords_file, self.config)
+            except (OSError, ValueError) as e:
+                logging.error(f"Ключевые слова не обновлены, продолжаем с прежними: {e}")
+                return self.matcher
+            added = len(matcher.entries - self.matcher.entries)
+            removed = len(self.matcher.entries - matcher.entries)
+            if added or removed:
+                logging.info(f"Ключевые слова обновлены: добавлено {added}, удалено {removed}")
+                self.matcher = matcher
+        return self.matcher
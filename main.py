@@ -6,7 +6,8 @@ import logging
 from config_loader import load_config, create_default_config
 from tesseract_setup import setup_tesseract
 from logging_setup import setup_logging
-from file_processing import load_keywords
+from file_processing import load_matcher
+from keywords_watcher import KeywordsWatcher
 from search_engine import search_files
 
 # Глобальные флаги для доступности функций
@@ -101,13 +102,18 @@ def main():
         logging.error(f"Директория '{directory}' не существует.")
         return
 
+    watcher = None
     try:
-        keywords = load_keywords(keywords_file)
+        if config.get('watch_keywords'):
+            watcher = KeywordsWatcher(keywords_file, config)
+            matcher = watcher.matcher
+        else:
+            matcher = load_matcher(keywords_file, config)
     except ValueError as e:
         logging.error(e)
         return
 
-    if not keywords:
+    if not matcher.keywords:
         logging.error("Не найдено ключевых слов.")
         return
 
@@ -115,10 +121,13 @@ def main():
     logging.info(f"Директория для поиска: {directory}")
     logging.info(f"Используемые маски: {extensions}")
     logging.info(f"Файл с ключевыми словами: {keywords_file}")
-    logging.info(f"Количество ключевых слов: {len(keywords)}")
+    logging.info(f"Количество ключевых слов: {len(matcher)}")
+    logging.info(f"Алгоритм поиска: {matcher.algorithm}")
+    logging.info(f"Режим сканирования: {matcher.scan_mode}")
+    logging.info(f"Отслеживание изменений {keywords_file}: {'включено' if watcher else 'отключено'}")
     logging.info(f"Используется потоков: {threads}")
     logging.info(f"Файл для результатов: {output_file}")
-    logging.info(f"Максимальный размер файла: {max_file_size} МБ")
+    logging.info(f"Максимальный размер файла: {max_file_size} МБ (текстовые файлы не ограничены)")
     logging.info(f"Поиск по изображениям: {'включен' if search_images and HAS_OCR else 'отключен'}")
 
     # Выводим информацию о доступных функциях
@@ -137,7 +146,8 @@ def main():
 
     # Выполняем поиск
     start_time = time.time()
-    results = search_files(directory, extensions, threads, output_file, max_file_size, config)
+    results = search_files(directory, extensions, threads, output_file, max_file_size, config, matcher=matcher,
+                           watcher=watcher)
     end_time = time.time()
 
     if results:
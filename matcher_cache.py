@@ -0,0 +1,119 @@
+import hashlib
+import hmac
+import logging
+import os
+import pickle
+from typing import Iterable
+
+from keyword_matcher import HAS_AHOCORASICK, KeywordMatcher
+
+# Меняется при изменении состава KeywordMatcher: старые файлы кэша перестают подходить
+MATCHER_CACHE_VERSION = 2
+
+# Сколько последних наборов хранить в каталоге кэша
+MATCHER_CACHE_FILES = 8
+
+# Значение matcher_cache_dir, при котором кэш хранится в каталоге пользователя (см. default_cache_dir)
+AUTO_CACHE_DIR = 'auto'
+
+# Начало файла кэша: метка формата, ключ набора (cache_key) и SHA-256 сохранённых данных
+CACHE_MAGIC = b'KWMC'
+_HEADER_SIZE = len(CACHE_MAGIC) + 2 * hashlib.sha256().digest_size
+
+
+def default_cache_dir() -> str:
+    """Каталог кэша в профиле пользователя: %LOCALAPPDATA% в Windows, иначе $XDG_CACHE_HOME или ~/.cache"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser(os.path.join('~', 'AppData', 'Local'))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+    return os.path.join(base, 'keyword_search', 'matcher_cache')
+
+
+def cache_key(entries: Iterable[str], options: dict) -> str:
+    """Хеш строк keywords.txt и параметров сборки.
+
+    В ключ входит и наличие pyahocorasick: от него зависит, какой алгоритм
+    выбирается при backend='auto'.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((MATCHER_CACHE_VERSION, HAS_AHOCORASICK, sorted(options.items()))).encode('utf-8'))
+    for entry in sorted(set(kw.strip() for kw in entries if kw and kw.strip())):
+        digest.update(entry.encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def load_cached_matcher(keywords: Iterable[str], options: dict, cache_dir: str) -> KeywordMatcher:
+    """Набор ключевых слов из кэша на диске или сборка с сохранением в кэш.
+
+    Собранный набор (автомат, префиксное дерево, таблицы основ слов)
+    сохраняется целиком и при следующем запуске читается одним чтением
+    файла, так что запуск не замедляется с ростом списка слов. Регулярные
+    выражения при загрузке компилируются заново - модуль re не умеет
+    сохранять скомпилированное выражение.
+
+    cache_dir='auto' - каталог в профиле пользователя (default_cache_dir).
+    Перед распаковкой проверяется заголовок файла: ключ набора должен
+    совпасть с ключом слов и параметров, а хеш - с самими данными. Это
+    защита от устаревших и повреждённых файлов, а не от подмены: хеш без
+    секрета пересчитает любой, кто может писать в каталог. От подмены
+    защищает только сам каталог - он создаётся доступным одному владельцу,
+    поэтому указывать в cache_dir общий каталог нельзя.
+    """
+    if cache_dir == AUTO_CACHE_DIR:
+        cache_dir = default_cache_dir()
+    keywords = list(keywords)
+    key = cache_key(keywords, options)
+    path = os.path.join(cache_dir, f"{key}.pickle")
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        matcher = KeywordMatcher.from_snapshot(pickle.loads(_verified_payload(data, key)))
+        # Время изменения - время последнего использования, по нему удаляются старые наборы
+        os.utime(path)
+        logging.info(f"Набор ключевых слов загружен из кэша {path}")
+        return matcher
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Не удалось прочитать кэш ключевых слов {path}, собираем заново: {e}")
+
+    matcher = KeywordMatcher(keywords, **options)
+    try:
+        # Каталог доступен только владельцу: распаковка pickle выполняет код из файла
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        payload = pickle.dumps(matcher.snapshot(), protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(CACHE_MAGIC + bytes.fromhex(key) + hashlib.sha256(payload).digest())
+            f.write(payload)
+        # Замена одним переименованием: параллельный запуск не прочитает недописанный файл
+        os.replace(temp_path, path)
+        _remove_stale(cache_dir)
+    except Exception as e:
+        logging.warning(f"Не удалось сохранить кэш ключевых слов {path}: {e}")
+    return matcher
+
+
+def _verified_payload(data: bytes, key: str) -> bytes:
+    """Данные файла кэша после проверки заголовка; ValueError - файл не от этого набора или повреждён"""
+    key_start = len(CACHE_MAGIC)
+    digest_start = key_start + hashlib.sha256().digest_size
+    if data[:key_start] != CACHE_MAGIC or data[key_start:digest_start] != bytes.fromhex(key):
+        raise ValueError("заголовок файла не соответствует набору ключевых слов")
+    payload = data[_HEADER_SIZE:]
+    if not hmac.compare_digest(data[digest_start:_HEADER_SIZE], hashlib.sha256(payload).digest()):
+        raise ValueError("контрольная сумма не совпадает")
+    return payload
+
+
+def _remove_stale(cache_dir: str) -> None:
+    """Удаление старых наборов сверх MATCHER_CACHE_FILES - каждое изменение keywords.txt даёт новый файл"""
+    files = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.pickle')]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[MATCHER_CACHE_FILES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
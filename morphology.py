@@ -0,0 +1,129 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Стеммер Портера для русского языка (алгоритм Snowball), встроен без внешних зависимостей.
+# Окончание группы 1 допустимо только после "а" или "я", группы 2 - после любой буквы.
+
+_VOWELS = frozenset('аеиоуыэюя')
+
+_PERFECTIVE_GERUND = {
+    'в': 1, 'вши': 1, 'вшись': 1,
+    'ив': 2, 'ивши': 2, 'ившись': 2, 'ыв': 2, 'ывши': 2, 'ывшись': 2,
+}
+
+_ADJECTIVE = dict.fromkeys((
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+    'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+), 2)
+
+_PARTICIPLE = {
+    'ем': 1, 'нн': 1, 'вш': 1, 'ющ': 1, 'щ': 1,
+    'ивш': 2, 'ывш': 2, 'ующ': 2,
+}
+
+_REFLEXIVE = dict.fromkeys(('ся', 'сь'), 2)
+
+_VERB = {
+    **dict.fromkeys((
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ), 1),
+    **dict.fromkeys((
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен',
+        'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ), 2),
+}
+
+_NOUN = dict.fromkeys((
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й',
+    'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+), 2)
+
+_SUPERLATIVE = ('ейше', 'ейш')
+_DERIVATIONAL = ('ость', 'ост')
+
+
+def _by_length(endings: Dict[str, int]) -> List[Tuple[str, int]]:
+    """Окончания от длинных к коротким: берётся самое длинное подходящее"""
+    return sorted(endings.items(), key=lambda item: -len(item[0]))
+
+
+_PERFECTIVE_GERUND = _by_length(_PERFECTIVE_GERUND)
+_ADJECTIVE = _by_length(_ADJECTIVE)
+_PARTICIPLE = _by_length(_PARTICIPLE)
+_REFLEXIVE = _by_length(_REFLEXIVE)
+_VERB = _by_length(_VERB)
+_NOUN = _by_length(_NOUN)
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """Начала областей RV и R2 по правилам Snowball"""
+    rv = r1 = r2 = len(word)
+    for i, ch in enumerate(word):
+        if ch in _VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word: str, start: int, endings: List[Tuple[str, int]]) -> Optional[str]:
+    """Отрезание самого длинного окончания из списка, лежащего целиком в области от start"""
+    for ending, group in endings:
+        cut = len(word) - len(ending)
+        if cut < start or not word.endswith(ending):
+            continue
+        if group == 1 and (cut - 1 < start or word[cut - 1] not in 'ая'):
+            return None
+        return word[:cut]
+    return None
+
+
+@lru_cache(maxsize=100000)
+def stem(word: str) -> str:
+    """Основа слова в нижнем регистре; слова не на кириллице возвращаются без изменений"""
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+
+    # Шаг 1: деепричастие, иначе возвратная частица и прилагательное, глагол или существительное
+    stripped = _strip(word, rv, _PERFECTIVE_GERUND)
+    if stripped is None:
+        word = _strip(word, rv, _REFLEXIVE) or word
+        stripped = _strip(word, rv, _ADJECTIVE)
+        if stripped is not None:
+            stripped = _strip(stripped, rv, _PARTICIPLE) or stripped
+        else:
+            stripped = _strip(word, rv, _VERB)
+            if stripped is None:
+                stripped = _strip(word, rv, _NOUN)
+    if stripped is not None:
+        word = stripped
+
+    # Шаг 2: конечное "и"
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательный суффикс в R2
+    for ending in _DERIVATIONAL:
+        if word.endswith(ending) and len(word) - len(ending) >= r2:
+            word = word[:-len(ending)]
+            break
+
+    # Шаг 4: превосходная степень, удвоенное "н", мягкий знак
+    superlative = next((e for e in _SUPERLATIVE if word.endswith(e) and len(word) - len(e) >= rv), None)
+    if superlative:
+        word = word[:-len(superlative)]
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif word.endswith('ь') and not superlative and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
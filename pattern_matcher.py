@@ -0,0 +1,190 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Флаги всех шаблонов: текст уже в нижнем регистре, ^ и $ - границы строк
+PATTERN_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Сколько символов перекрываются окна потока: более длинное совпадение шаблона на границе блоков может потеряться
+PATTERN_CONTEXT_CHARS = 1024
+
+# Шаблоны с обратными ссылками и именованными группами нельзя объединить в одно выражение
+_UNCOMBINABLE_RE = re.compile(r'\\[1-9]|\(\?P[<=]')
+
+
+def glob_to_regex(glob: str) -> str:
+    """Шаблон с подстановочными знаками в регулярное выражение: * - любые непробельные символы, ? - один"""
+    parts = []
+    for ch in glob:
+        if ch == '*':
+            parts.append(r'\S*')
+        elif ch == '?':
+            parts.append(r'\S')
+        else:
+            parts.append(re.escape(ch))
+    return ''.join(parts)
+
+
+_CATEGORY_CLASSES = {
+    'CATEGORY_DIGIT': r'\d', 'CATEGORY_NOT_DIGIT': r'\D',
+    'CATEGORY_SPACE': r'\s', 'CATEGORY_NOT_SPACE': r'\S',
+    'CATEGORY_WORD': r'\w', 'CATEGORY_NOT_WORD': r'\W',
+}
+
+
+def _first_items(items) -> Tuple[Optional[List[str]], bool]:
+    """Элементы класса символов, с которых может начинаться совпадение, и может ли оно быть пустым.
+
+    None вместо списка - первый символ может быть любым (или разбор не удался).
+    """
+    result: List[str] = []
+    for op, av in items:
+        op = str(op)
+        if op == 'LITERAL':
+            return result + [re.escape(chr(av))], False
+        if op == 'IN':
+            for item_op, item_av in av:
+                item_op = str(item_op)
+                if item_op == 'LITERAL':
+                    result.append(re.escape(chr(item_av)))
+                elif item_op == 'RANGE':
+                    result.append(f"{re.escape(chr(item_av[0]))}-{re.escape(chr(item_av[1]))}")
+                elif item_op == 'CATEGORY' and str(item_av) in _CATEGORY_CLASSES:
+                    result.append(_CATEGORY_CLASSES[str(item_av)])
+                else:
+                    return None, False
+            return result, False
+        if op in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            # Границы и просмотры не занимают символов - смотрим дальше
+            continue
+        if op == 'SUBPATTERN':
+            sub, nullable = _first_items(av[-1])
+        elif op == 'ATOMIC_GROUP':
+            sub, nullable = _first_items(av)
+        elif op == 'BRANCH':
+            sub, nullable = [], False
+            for branch in av[1]:
+                branch_items, branch_nullable = _first_items(branch)
+                if branch_items is None:
+                    return None, False
+                sub += branch_items
+                nullable = nullable or branch_nullable
+        elif op in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            sub, nullable = _first_items(av[2])
+            nullable = nullable or av[0] == 0
+        else:
+            return None, False
+        if sub is None:
+            return None, False
+        result += sub
+        if not nullable:
+            return result, False
+    return result, True
+
+
+def first_char_class(source: str) -> Optional[str]:
+    """Класс символов, которым начинается любое совпадение шаблона, или None, если его не вывести"""
+    try:
+        items, nullable = _first_items(sre_parse.parse(source, PATTERN_FLAGS))
+    except Exception:
+        return None
+    if items is None or nullable or not items:
+        return None
+    return '[' + ''.join(items) + ']'
+
+
+class PatternMatcher:
+    """Поиск по регулярным выражениям и шаблонам за один проход по тексту.
+
+    Все шаблоны объединяются в одно выражение-альтернативу внутри просмотра
+    вперёд: движок re проверяет каждую позицию текста сразу на все шаблоны,
+    а не пробегает текст отдельно для каждого. В позиции совпадения
+    альтернатива срабатывает только для первого подходящего шаблона, поэтому
+    остальные шаблоны проверяются в этой же позиции отдельно - совпадения
+    редки, и это дешевле повторных проходов по всему тексту.
+
+    Шаблоны проверяются в каждой позиции, поэтому \\d{10} внутри 12 цифр
+    найдётся трижды - границы слова задаются в самом шаблоне через \\b.
+
+    Перед альтернативой ставится общий класс первых символов всех шаблонов:
+    объединённое выражение теряет оптимизации отдельных шаблонов по первому
+    символу, и без этого класса движок re пробовал бы каждую альтернативу
+    в каждой позиции текста.
+    """
+    name = 'patterns'
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        """entries - пары (метка для отчёта, регулярное выражение)"""
+        self._labels: List[str] = []
+        self._compiled: List[re.Pattern] = []
+        for label, source in sorted(set(entries)):
+            try:
+                self._compiled.append(re.compile(source, PATTERN_FLAGS))
+            except re.error as e:
+                raise ValueError(f"Ошибка в шаблоне '{label}': {e}")
+            self._labels.append(label)
+
+        combinable = [i for i, pattern in enumerate(self._compiled)
+                      if not _UNCOMBINABLE_RE.search(pattern.pattern)]
+        # Отдельно проходятся только шаблоны, которые нельзя объединить
+        self._separate = sorted(set(range(len(self._compiled))) - set(combinable))
+        self._combined: Optional[re.Pattern] = None
+        self._group_to_pattern: Dict[int, int] = {}
+        if combinable:
+            alternatives = [f"(?P<_p{i}>{self._compiled[i].pattern})" for i in combinable]
+            first_classes = [first_char_class(self._compiled[i].pattern) for i in combinable]
+            prefilter = ''
+            if all(first_classes):
+                prefilter = '(?=[' + ''.join(cls[1:-1] for cls in first_classes) + '])'
+            try:
+                self._combined = re.compile(prefilter + '(?=(?:' + '|'.join(alternatives) + '))', PATTERN_FLAGS)
+            except re.error:
+                # Например, флаги внутри шаблона допустимы только в его начале - проходим по отдельности
+                self._separate = list(range(len(self._compiled)))
+            else:
+                self._group_to_pattern = {self._combined.groupindex[f"_p{i}"]: i for i in combinable}
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def iter_spans(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Тройки (начало, конец, метка шаблона) для всех позиций, где совпал хотя бы один шаблон"""
+        labels, compiled = self._labels, self._compiled
+        if self._combined is not None:
+            order = list(self._group_to_pattern.values())
+            for match in self._combined.finditer(text):
+                group = match.lastindex
+                first = self._group_to_pattern[group]
+                start = match.start()
+                yield start, match.end(group), labels[first]
+                # Шаблоны после сработавшей альтернативы в этой позиции не проверялись
+                for i in order[order.index(first) + 1:]:
+                    other = compiled[i].match(text, start)
+                    if other:
+                        yield start, other.end(), labels[i]
+        for i in self._separate:
+            for match in compiled[i].finditer(text):
+                yield match.start(), match.end(), labels[i]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        for start, _, label in self.iter_spans(text):
+            yield start, label
+
+    def search(self, text: str) -> Set[str]:
+        found = set()
+        for _, _, label in self.iter_spans(text):
+            found.add(label)
+            if len(found) == len(self._labels):
+                break
+        return found
+
+    def first(self, text: str) -> Optional[str]:
+        return next((label for _, _, label in self.iter_spans(text)), None)
+
+    def count(self, text: str) -> Counter:
+        return Counter(label for _, _, label in self.iter_spans(text))
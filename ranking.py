@@ -0,0 +1,56 @@
+import heapq
+import math
+import os
+from itertools import count
+from typing import List, Tuple
+
+from keyword_matcher import FileHits
+
+# Веса составляющих релевантности файла
+DISTINCT_WEIGHT = 10.0   # за каждое разное найденное слово
+TOTAL_WEIGHT = 2.0       # за логарифм общего числа вхождений
+DENSITY_WEIGHT = 1.0     # за вхождения на килобайт текста
+NAME_WEIGHT = 5.0        # за каждое слово в имени файла
+
+# Плотность выше этой не добавляет очков - иначе крошечные файлы всегда первые
+MAX_DENSITY = 10.0
+
+
+def score_hits(file_path: str, hits: FileHits) -> float:
+    """Релевантность файла: разнообразие слов, число и плотность вхождений, слова в имени файла"""
+    distinct = len(hits.found)
+    total = hits.total
+    density = total / max(hits.scanned / 1024, 1.0)
+    in_name = len(hits.matcher.search(os.path.basename(file_path)))
+    return (DISTINCT_WEIGHT * distinct
+            + TOTAL_WEIGHT * math.log1p(total)
+            + DENSITY_WEIGHT * min(density, MAX_DENSITY)
+            + NAME_WEIGHT * in_name)
+
+
+class RankedResults:
+    """Накопление результатов с упорядочиванием по релевантности.
+
+    При top_k > 0 хранится не более top_k лучших файлов (куча по минимуму),
+    поэтому память не растёт с числом найденных файлов.
+    """
+
+    def __init__(self, top_k: int = 0):
+        self.top_k = max(top_k, 0)
+        self._heap: List[Tuple[float, int, str, FileHits]] = []
+        # Порядковый номер разрешает равенство очков без сравнения FileHits
+        self._order = count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, file_path: str, hits: FileHits) -> None:
+        entry = (score_hits(file_path, hits), -next(self._order), file_path, hits)
+        if not self.top_k or len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def ranked(self) -> List[Tuple[str, FileHits, float]]:
+        """Тройки (путь, совпадения, очки) от самого релевантного файла"""
+        return [(path, hits, score) for score, _, path, hits in sorted(self._heap, reverse=True)]
@@ -1,30 +1,163 @@
 import os
-import fnmatch
+import queue
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from tqdm import tqdm
 import logging
 
+from file_discovery import Discovery, FoundFile, SeenFiles, compile_extensions
 from file_processing import process_file  # Импортируем функцию обработки файла
+from keyword_matcher import FileHits, KeywordMatcher
+from ranking import RankedResults
+
+# Сколько найденных файлов на один поток обработки может ждать в очереди
+PIPELINE_QUEUE_PER_WORKER = 4
+
+_DONE = object()
+
+
+def write_result(output_handle, path: str, hits: FileHits, score: float = None, aliases: List[str] = ()) -> None:
+    """Запись результата по одному файлу в файл отчёта; aliases - другие пути того же файла"""
+    output_handle.write(f"Файл: {path}\n")
+    if aliases:
+        output_handle.write(f"Другие пути: {', '.join(aliases)}\n")
+    if score is not None:
+        output_handle.write(f"Релевантность: {score:.1f}\n")
+    output_handle.write(f"Найденные ключевые слова: {hits.keyword_summary()}\n")
+    for line in hits.location_lines():
+        output_handle.write(f"{line}\n")
+    output_handle.write("\n")
+    output_handle.flush()
+
+
+def make_ranking(config: dict) -> Optional[RankedResults]:
+    """Накопитель для упорядочивания результатов или None, если они выводятся по мере нахождения"""
+    top_k = config.get('top_results', 0)
+    return RankedResults(top_k) if config.get('sort_results', False) or top_k else None
+
+
+def write_ranked(output_file: str, ranking: RankedResults, seen: SeenFiles) -> Dict[str, FileHits]:
+    """Запись упорядоченных результатов в отчёт; возвращает их в том же порядке"""
+    ranked = ranking.ranked()
+    if output_file:
+        with open(output_file, 'a', encoding='utf-8') as output_handle:
+            for path, hits, score in ranked:
+                write_result(output_handle, path, hits, score, seen.aliases(path))
+    return {path: hits for path, hits, _ in ranked}
+
+
+def write_late_aliases(output_file: str, reported: Dict[str, int], seen: SeenFiles) -> List[Tuple[str, List[str]]]:
+    """Дописывает в отчёт другие пути, найденные уже после записи результата файла.
+
+    reported - сколько других путей записано для каждого файла (см. search_files).
+    Повтор файла может встретиться позже в обходе или в следующей директории,
+    поэтому вызывается после обхода всех директорий. Возвращает (путь, новые пути).
+    """
+    late = []
+    for path, count in reported.items():
+        aliases = seen.aliases(path)
+        if len(aliases) > count:
+            late.append((path, aliases[count:]))
+            reported[path] = len(aliases)
+    if late and output_file:
+        with open(output_file, 'a', encoding='utf-8') as output_handle:
+            output_handle.write("Другие пути, найденные после записи результатов:\n\n")
+            for path, aliases in late:
+                output_handle.write(f"Файл: {path}\nДругие пути: {', '.join(aliases)}\n\n")
+    return late
+
+
+def _refresh_hits(path: str, hits: Optional[FileHits], used: KeywordMatcher, latest: KeywordMatcher, text_cache,
+                  extensions: List[str], max_file_size: int, config: dict) -> Optional[FileHits]:
+    """Совпадения файла, обработанного прежним набором слов, для актуального набора.
+
+    Удалённые слова отбрасываются, а на добавленные файл проверяется
+    отдельно - по сохранённому тексту, если он есть, иначе обрабатывается заново.
+    """
+    extra = None
+    added = latest.entries - used.entries
+    if added:
+        delta = latest.rebuilt(added)
+        segments = text_cache.get(path)
+        if segments is not None:
+            extra = FileHits(delta)
+            extra.replay(segments)
+            extra.finish()
+        else:
+            extra = process_file(path, extensions, max_file_size, config, delta).get(path)
+    merged = (hits or FileHits(used)).merged(latest, extra)
+    return merged or None
 
 
 def search_files(root_dir: str, extensions: List[str], max_workers: int = 4, output_file: str = None,
                  max_file_size: int = 10, config: dict = None, progress_callback: callable = None,
-                 start_count: int = 0) -> Dict[str, Set[str]]:
-    """Многопоточный поиск файлов с поддержкой offset"""
+                 start_count: int = 0, matcher: KeywordMatcher = None, watcher=None,
+                 discovery: Discovery = None, ranking: RankedResults = None,
+                 reported_aliases: Dict[str, int] = None) -> Dict[str, FileHits]:
+    """Многопоточный поиск файлов с поддержкой offset.
+
+    С sort_results результаты упорядочиваются по релевантности и пишутся в отчёт
+    после обработки директории; top_results > 0 оставляет только лучшие файлы.
+    ranking - общий накопитель для поиска по нескольким директориям (см.
+    make_ranking): результаты директории добавляются в него и возвращаются
+    неупорядоченными, а упорядоченный отчёт по всем директориям пишет
+    вызывающий (write_ranked).
+
+    watcher (KeywordsWatcher) - слежение за keywords.txt: набор слов берётся
+    перед каждым файлом, а в конце файлы, обработанные прежним набором,
+    проверяются на добавленные слова. Результаты тогда пишутся в отчёт после
+    обработки директории.
+
+    discovery - обход root_dir, если вызывающему нужен его счётчик файлов
+    (например, для индикатора прогресса) или общий для нескольких директорий
+    учёт повторов файлов; иначе создаётся здесь.
+
+    Результаты без упорядочивания пишутся сразу, а повтор файла может найтись
+    позже, поэтому другие пути, найденные после записи, дописываются в конец
+    отчёта (write_late_aliases). reported_aliases - общий для нескольких
+    директорий учёт записанных путей: тогда дописывает вызывающий после
+    последней директории.
+    """
+    if watcher is not None:
+        matcher = watcher.current()
+    if matcher is None:
+        raise ValueError("Не передан набор ключевых слов (matcher)")
+
+    config = config or {}
+    # Маски разбираются один раз и дальше передаются собранными
+    extensions = compile_extensions(extensions)
+    if discovery is None:
+        discovery = Discovery(root_dir, extensions, max_file_size, config)
+    shared_ranking = ranking is not None
+    if not shared_ranking:
+        ranking = make_ranking(config)
+    shared_aliases = reported_aliases is not None
+    if not shared_aliases:
+        reported_aliases = {}
     results = {}
+    # С отслеживанием слов: каким набором обработан каждый файл и что в нём найдено
+    processed: Dict[str, KeywordMatcher] = {}
+    pending: Dict[str, FileHits] = {}
+    text_cache = watcher.text_cache if watcher is not None else None
 
-    # Собираем все файлы для обработки
-    files_to_process = []
-    for root, _, files in os.walk(root_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if any(fnmatch.fnmatch(file, ext_pattern) for ext_pattern in extensions):
-                files_to_process.append(file_path)
+    def run(found: FoundFile) -> Tuple[KeywordMatcher, Dict[str, FileHits]]:
+        used = watcher.current() if watcher is not None else matcher
+        return used, process_file(found.path, extensions, max_file_size, config, used, text_cache, found.size)
 
-    logging.info(f"Найдено файлов для обработки в {root_dir}: {len(files_to_process)}")
+    def emit(path: str, hits: FileHits) -> None:
+        if ranking is not None:
+            ranking.add(path, hits)
+            if shared_ranking:
+                results[path] = hits
+        else:
+            results[path] = hits
+            if output_handle:
+                aliases = discovery.seen.aliases(path)
+                reported_aliases[path] = len(aliases)
+                write_result(output_handle, path, hits, aliases=aliases)
 
     # Открываем файл для записи результатов
     output_handle = None
@@ -34,45 +167,117 @@ def search_files(root_dir: str, extensions: List[str], max_workers: int = 4, out
             output_handle.write("Результаты поиска:\n\n")
             output_handle.write(f"Время начала: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
 
-    # Обрабатываем файлы в несколько потоков
-    with tqdm(total=len(files_to_process), desc=f"Обработка {os.path.basename(root_dir)}", unit="файл") as pbar:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_file = {
-                executor.submit(process_file, file_path, extensions, max_file_size, config): file_path
-                for file_path in files_to_process
-            }
-
-            for i, future in enumerate(as_completed(future_to_file)):
-                file_path = future_to_file[future]
-                total_processed = start_count + i + 1
-
-                # Вызываем callback для обновления прогресса в GUI
-                if progress_callback and callable(progress_callback):
-                    try:
-                        # Передаем только имя файла, не специальные сообщения
-                        progress_callback(os.path.basename(file_path), total_processed)
-                    except Exception as e:
-                        logging.error(f"Ошибка в callback: {e}")
+    # Конвейер: обход каталогов кладёт файлы в ограниченную очередь, обработчики
+    # берут их оттуда, а результаты собираются в этом потоке. Если обработчики
+    # не успевают, обход ждёт свободного места в очереди
+    tasks: queue.Queue = queue.Queue(maxsize=max_workers * PIPELINE_QUEUE_PER_WORKER)
+    done: queue.Queue = queue.Queue()
+    stop = threading.Event()
 
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                tasks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def discover() -> None:
+        try:
+            for found in discovery:
+                if not put(found):
+                    return
+        except Exception as e:
+            logging.error(f"Ошибка обхода директории {root_dir}: {e}")
+        finally:
+            for _ in range(max_workers):
+                put(_DONE)
+
+    def work() -> None:
+        try:
+            while not stop.is_set():
                 try:
-                    result = future.result(timeout=300)
-                    if result:
-                        results.update(result)
-                        if output_handle:
-                            for path, keywords_found in result.items():
-                                output_handle.write(f"Файл: {path}\n")
-                                output_handle.write(f"Найденные ключевые слова: {', '.join(keywords_found)}\n\n")
-                                output_handle.flush()
-                except TimeoutError:
-                    logging.error(f"Таймаут при обработке файла {file_path}")
+                    found = tasks.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if found is _DONE:
+                    return
+                try:
+                    done.put((found.path, run(found), None))
                 except Exception as e:
-                    logging.error(f"Ошибка при обработке файла {file_path}: {e}")
-                finally:
+                    done.put((found.path, None, e))
+        finally:
+            done.put(_DONE)
+
+    # Обрабатываем файлы в несколько потоков
+    with tqdm(total=0, desc=f"Обработка {os.path.basename(root_dir)}", unit="файл") as pbar:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            walker = threading.Thread(target=discover, name='discovery', daemon=True)
+            walker.start()
+            for _ in range(max_workers):
+                executor.submit(work)
+
+            try:
+                i = 0
+                running = max_workers
+                while running:
+                    item = done.get()
+                    if item is _DONE:
+                        running -= 1
+                        continue
+                    file_path, outcome, error = item
+                    i += 1
+                    total_processed = start_count + i
+
+                    # Вызываем callback для обновления прогресса в GUI
+                    if progress_callback and callable(progress_callback):
+                        try:
+                            # Передаем только имя файла, не специальные сообщения
+                            progress_callback(os.path.basename(file_path), total_processed)
+                        except Exception as e:
+                            logging.error(f"Ошибка в callback: {e}")
+
+                    if error is not None:
+                        logging.error(f"Ошибка при обработке файла {file_path}: {error}")
+                    elif watcher is not None:
+                        used, result = outcome
+                        processed[file_path] = used
+                        pending.update(result)
+                    else:
+                        for path, hits in outcome[1].items():
+                            emit(path, hits)
+
+                    # Общее число файлов растёт по мере обхода каталогов
+                    pbar.total = discovery.total
                     pbar.update(1)
                     pbar.set_postfix(file=os.path.basename(file_path)[:20])
+            finally:
+                stop.set()
+
+            if watcher is not None:
+                latest = watcher.current()
+                stale = [path for path, used in processed.items() if used is not latest]
+                if stale:
+                    logging.info(f"Повторная проверка на изменённые ключевые слова: {len(stale)} файлов")
+                refreshed = executor.map(lambda path: _refresh_hits(path, pending.get(path), processed[path], latest,
+                                                                    text_cache, extensions, max_file_size, config),
+                                         stale)
+                for path, hits in zip(stale, refreshed):
+                    if hits:
+                        pending[path] = hits
+                    else:
+                        pending.pop(path, None)
+                for path, hits in pending.items():
+                    emit(path, hits)
 
     if output_handle:
         output_handle.close()
 
+    if ranking is not None and not shared_ranking:
+        results = write_ranked(output_file, ranking, discovery.seen)
+    if not shared_aliases:
+        write_late_aliases(output_file, reported_aliases, discovery.seen)
+
     logging.info(f"Завершена обработка директории {root_dir}. Найдено совпадений: {len(results)}")
     return results
\ No newline at end of file
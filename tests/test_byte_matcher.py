@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from byte_matcher import lower_bytes
+from keyword_matcher import FileHits, KeywordMatcher
+
+TEXT = ('ООО Ромашка подписала АКТ сверки. PDF-файл приложен, ДоГоВоР № 5 и Договор № 6.\n'
+        'ЁЛКА, Ёлка и ёлка; Contract и CONTRACT; ПоСтАвКа ТоВаРоВ.\n') * 30
+
+KEYWORDS = ['ооо ромашка', 'акт сверки', 'pdf-файл', 'договор', 'ёлка', 'contract', 'поставка товаров']
+
+
+def baseline_counts(text, keywords):
+    lowered = text.lower()
+    counts = {}
+    for keyword in keywords:
+        found = sum(1 for i in range(len(lowered)) if lowered.startswith(keyword, i))
+        if found:
+            counts[keyword] = found
+    return counts
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'cp1251', 'utf-16-le'])
+@pytest.mark.parametrize('chunk_size', [13, 4096])
+@pytest.mark.parametrize('backend', ['naive', 'regex', 'aho_corasick'])
+def test_raw_bytes_match_any_case_like_lowered_text(encoding, chunk_size, backend):
+    data = TEXT.encode(encoding)
+    hits = FileHits(KeywordMatcher(KEYWORDS, backend=backend))
+    hits.scan_stream(io.BytesIO(data), chunk_size)
+    assert dict(hits.counts) == baseline_counts(TEXT, KEYWORDS)
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'cp1251', 'utf-16-le'])
+def test_lower_bytes_matches_str_lower(encoding):
+    text = 'АБВ ЁЖЗ abc XYZ Ўў ПРИВЕТ, Мир!'
+    assert lower_bytes(text.encode(encoding), encoding) == text.lower().encode(encoding)
+
+
+def test_lower_bytes_keeps_utf16_alignment():
+    data = b'\x00' + 'ДОГОВОР'.encode('utf-16-le')
+    assert lower_bytes(data, 'utf-16-le', offset=1) == b'\x00' + 'договор'.encode('utf-16-le')
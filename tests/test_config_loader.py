@@ -0,0 +1,18 @@
+from config_loader import load_config
+
+
+def test_bad_filter_values_fall_back_to_defaults(tmp_path, capsys):
+    config_file = tmp_path / 'config.txt'
+    config_file.write_text('[Settings]\n'
+                           'size_limits = .txt:abc, .pdf:5\n'
+                           'modified_after = 2024-13-40\n'
+                           'modified_before = 01.02.2024\n'
+                           'max_age_days = ten\n', encoding='utf-8')
+    config = load_config(str(config_file))
+    assert config['size_limits'] == {}
+    assert config['modified_after'] == ''
+    assert config['modified_before'] == '01.02.2024'
+    assert config['max_age_days'] == 0
+    output = capsys.readouterr().out
+    for key in ('size_limits', 'modified_after', 'max_age_days'):
+        assert key in output
@@ -0,0 +1,41 @@
+import pytest
+
+from content_sniffing import sniff, sniff_file
+
+TEXT = 'Договор поставки № 17 от 01.02.2024. Contract for supply of goods.\n' * 20
+
+
+@pytest.mark.parametrize('encoding', ['utf-16-le', 'utf-16-be'])
+def test_utf16_without_bom_is_text(encoding):
+    assert sniff(TEXT.encode(encoding)) == 'text'
+
+
+@pytest.mark.parametrize('encoding', ['utf-8-sig', 'utf-16', 'utf-16-be'])
+def test_text_with_bom(encoding):
+    data = TEXT.encode(encoding)
+    if encoding == 'utf-16-be':
+        data = b'\xfe\xff' + data
+    assert sniff(data) == 'text'
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'cp1251'])
+def test_single_byte_text(encoding):
+    assert sniff(TEXT.encode(encoding)) == 'text'
+
+
+def test_nul_bytes_on_both_parities_are_binary():
+    data = (b'\x05\x00\x00\x00\x10\x27\x00\x00' + bytes(range(1, 200))) * 20
+    assert sniff(data) == 'binary'
+
+
+def test_signatures():
+    assert sniff(b'%PDF-1.7\n') == 'pdf'
+    assert sniff(b'\x00' * 100 + b'%PDF-1.4') == 'pdf'
+    assert sniff(b'\x89PNG\r\n\x1a\n' + b'\x00' * 100) == 'image'
+    assert sniff(b'\x7fELF' + b'\x00' * 100) == 'binary'
+
+
+def test_sniff_file_reads_utf16_text(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes(TEXT.encode('utf-16-le'))
+    assert sniff_file(str(path)) == 'text'
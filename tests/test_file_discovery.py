@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+from file_discovery import Discovery, SeenFiles, WalkRules, normalize_roots, walk_files
+
+
+def make_tree(base, files):
+    for name in files:
+        path = base / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('договор', encoding='utf-8')
+
+
+def walked(root, extensions=('*.txt',), **kwargs):
+    return sorted(os.path.relpath(found.path, root) for found in walk_files(str(root), extensions, **kwargs))
+
+
+def test_normalize_roots_keeps_spelling_and_drops_nested(tmp_path):
+    make_tree(tmp_path, ['data/a.txt', 'data/sub/b.txt'])
+    data = str(tmp_path / 'data')
+    spelled = data + os.sep + 'sub' + os.sep + '..'
+    assert normalize_roots([spelled, data, os.path.join(data, 'sub')]) == [spelled]
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='нужны символьные ссылки')
+def test_normalize_roots_keeps_symlinked_root(tmp_path):
+    make_tree(tmp_path, ['data/a.txt'])
+    link = tmp_path / 'link'
+    link.symlink_to(tmp_path / 'data', target_is_directory=True)
+    assert normalize_roots([str(link), str(tmp_path / 'data')]) == [str(link)]
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='нужны символьные ссылки')
+def test_exclude_paths_in_root_spelling(tmp_path):
+    make_tree(tmp_path, ['data/keep/a.txt', 'data/skip/b.txt'])
+    link = tmp_path / 'link'
+    link.symlink_to(tmp_path / 'data', target_is_directory=True)
+    rules = WalkRules(exclude_paths=[str(link / 'skip')])
+    [root] = normalize_roots([str(link)])
+    assert [found.path for found in walk_files(root, ['*.txt'], rules=rules)] == [str(link / 'keep' / 'a.txt')]
+
+
+def test_exclude_globs_hidden_and_depth(tmp_path):
+    make_tree(tmp_path, ['a.txt', 'a.bak.txt', 'node_modules/x.txt', '.git/y.txt', '.hidden.txt',
+                         'one/two/deep.txt', 'one/b.txt'])
+    rules = WalkRules(exclude_globs=['node_modules', '*.bak.txt'], skip_hidden=True, max_depth=2)
+    assert walked(tmp_path, rules=rules) == ['a.txt', os.path.join('one', 'b.txt')]
+
+
+def test_discovery_counts_filtered_files(tmp_path):
+    make_tree(tmp_path, ['a.txt', 'b.txt'])
+    (tmp_path / 'empty.txt').write_text('')
+    discovery = Discovery(str(tmp_path), ['*.txt'], 10, {'min_file_size_kb': 0})
+    assert len(list(discovery)) == 3 and discovery.finished
+    discovery = Discovery(str(tmp_path), ['*.txt'], 10, {'modified_before': '2000-01-01'})
+    assert list(discovery) == [] and discovery.skipped['изменены позже заданной даты'] == 3
+
+
+def discover(roots, config=None, extensions=('*.txt',)):
+    roots = normalize_roots([str(root) for root in roots])
+    seen = SeenFiles(roots)
+    paths = []
+    for root in roots:
+        paths.extend(found.path for found in Discovery(root, extensions, 10, config, seen))
+    return sorted(paths), seen
+
+
+needs_symlinks = pytest.mark.skipif(not hasattr(os, 'symlink'), reason='нужны символьные ссылки')
+
+
+@needs_symlinks
+def test_link_to_walked_file_is_an_alias(tmp_path):
+    make_tree(tmp_path, ['data/a.txt'])
+    (tmp_path / 'data' / 'z_link.txt').symlink_to(tmp_path / 'data' / 'a.txt')
+    (tmp_path / 'data' / '0_link.txt').symlink_to(tmp_path / 'data' / 'a.txt')
+    paths, seen = discover([tmp_path / 'data'], {'ordered_discovery': True})
+    assert paths == [str(tmp_path / 'data' / 'a.txt')]
+    assert sorted(seen.aliases(paths[0])) == [str(tmp_path / 'data' / '0_link.txt'),
+                                              str(tmp_path / 'data' / 'z_link.txt')]
+
+
+@needs_symlinks
+@pytest.mark.parametrize('target, config', [
+    ('.hidden/a.txt', {'skip_hidden': True}),
+    ('skip/a.txt', {'exclude_globs': ['skip']}),
+    ('deep/er/a.txt', {'max_depth': 2}),
+    ('a.dat', {}),
+])
+def test_link_to_file_the_walk_skips_is_processed(tmp_path, target, config):
+    make_tree(tmp_path, ['data/' + target])
+    link = tmp_path / 'data' / 'link.txt'
+    link.symlink_to(tmp_path / 'data' / target)
+    paths, _ = discover([tmp_path / 'data'], config)
+    assert paths == [str(link)]
+
+
+@needs_symlinks
+def test_link_to_file_over_its_size_limit_is_processed(tmp_path):
+    (tmp_path / 'big.txt').write_bytes(b'x' * 2 * 1024 * 1024)
+    link = tmp_path / 'link.log'
+    link.symlink_to(tmp_path / 'big.txt')
+    paths, _ = discover([tmp_path], {'size_limits': {'.txt': 1}}, ('*.txt', '*.log'))
+    assert paths == [str(link)]
+
+
+@needs_symlinks
+def test_links_outside_roots_are_processed_once(tmp_path):
+    make_tree(tmp_path, ['outside/a.txt', 'data/b.txt'])
+    (tmp_path / 'data' / 'one.txt').symlink_to(tmp_path / 'outside' / 'a.txt')
+    (tmp_path / 'data' / 'two.txt').symlink_to(tmp_path / 'outside' / 'a.txt')
+    paths, seen = discover([tmp_path / 'data'], {'ordered_discovery': True})
+    assert paths == [str(tmp_path / 'data' / 'b.txt'), str(tmp_path / 'data' / 'one.txt')]
+    assert seen.aliases(paths[1]) == [str(tmp_path / 'data' / 'two.txt')]
+
+
+@needs_symlinks
+def test_link_into_another_root(tmp_path):
+    make_tree(tmp_path, ['first/a.txt', 'second/b.txt'])
+    (tmp_path / 'first' / 'link.txt').symlink_to(tmp_path / 'second' / 'b.txt')
+    paths, _ = discover([tmp_path / 'first', tmp_path / 'second'])
+    assert paths == [str(tmp_path / 'first' / 'a.txt'), str(tmp_path / 'second' / 'b.txt')]
+
+
+def test_hardlinks_are_processed_once(tmp_path):
+    make_tree(tmp_path, ['data/a.txt'])
+    try:
+        os.link(tmp_path / 'data' / 'a.txt', tmp_path / 'data' / 'b.txt')
+    except OSError:
+        pytest.skip('жёсткие ссылки не поддерживаются')
+    paths, seen = discover([tmp_path / 'data'])
+    assert len(paths) == 1 and len(seen.aliases(paths[0])) == 1
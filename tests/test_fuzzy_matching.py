@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from fuzzy_matching import OCR_CONFUSIONS, FuzzyMatcher, allowed_distance
+
+
+def reference_ends(keyword, text, distance):
+    """Позиции, где заканчивается подстрока текста на расстоянии не больше distance (алгоритм Селлерса)"""
+    allowed = [{ch, OCR_CONFUSIONS.get(ch, ch)} for ch in keyword]
+    column = list(range(len(keyword) + 1))
+    ends = set()
+    for i, ch in enumerate(text):
+        previous, column = column, [0]
+        for j in range(1, len(keyword) + 1):
+            cost = 0 if ch in allowed[j - 1] else 1
+            column.append(min(previous[j - 1] + cost, previous[j] + 1, column[j - 1] + 1))
+        if column[-1] <= distance:
+            ends.add(i)
+    return ends
+
+
+KEYWORDS = ['договор', 'поставка', 'счётфактура', 'оплата', 'акт']
+
+
+@pytest.mark.parametrize('max_distance', [1, 2])
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_edit_distance_reference(max_distance, seed):
+    rng = random.Random(seed)
+    alphabet = 'договрпсткаулёфя0 '
+    text = ''.join(rng.choice(alphabet) for _ in range(150))
+    # Вставляем искажённые слова, чтобы совпадения действительно встречались
+    for keyword in KEYWORDS:
+        word = list(keyword)
+        word[rng.randrange(len(word))] = rng.choice(alphabet)
+        position = rng.randrange(len(text))
+        text = text[:position] + ''.join(word) + text[position:]
+    matcher = FuzzyMatcher(KEYWORDS, max_distance)
+    found = {}
+    for i, keyword, _ in matcher._iter_ends(text):
+        found.setdefault(keyword, set()).add(i)
+    for keyword in KEYWORDS:
+        distance = allowed_distance(keyword, max_distance)
+        expected = reference_ends(keyword, text, distance) if distance else set()
+        assert found.get(keyword, set()) == expected, keyword
+
+
+def test_short_words_are_not_searched():
+    matcher = FuzzyMatcher(['акт', 'счёт'], 1)
+    assert len(matcher) == 0
+    assert matcher.first('акт счёт') is None
+
+
+def test_ocr_confusions_are_not_errors():
+    matcher = FuzzyMatcher(['договор'], 1)
+    assert matcher.first('д0г0в0р') == 'договор'
+    assert matcher.first('дxгxвор') is None
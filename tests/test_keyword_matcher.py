@@ -0,0 +1,117 @@
+import io
+
+import pytest
+
+from keyword_matcher import FileHits, KeywordMatcher
+
+TEXT = ("Договор поставки № 17. Акт приёмки подписан; счёт-фактура приложена.\n"
+        "Сторона договора обязуется оплатить поставку. Актив, акты и договоры.\n") * 40
+
+KEYWORDS = ['договор', 'акт', 'поставк', 'счёт-фактура', 'обязуется оплатить']
+
+
+def stream_hits(matcher, data, chunk_size):
+    hits = FileHits(matcher)
+    hits.scan_stream(io.BytesIO(data), chunk_size)
+    return hits
+
+
+def text_hits(matcher, text):
+    hits = FileHits(matcher)
+    hits.scan(text)
+    return hits
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'cp1251', 'utf-16-le'])
+@pytest.mark.parametrize('backend', ['naive', 'regex'])
+def test_byte_path_matches_decoded_text(encoding, backend):
+    matcher = KeywordMatcher(KEYWORDS, backend=backend)
+    data = TEXT.encode(encoding)
+    if encoding == 'utf-16-le':
+        data = b'\xff\xfe' + data
+    assert stream_hits(matcher, data, 4096).counts == text_hits(matcher, TEXT).counts
+
+
+@pytest.mark.parametrize('chunk_size', [7, 64, 1000])
+def test_chunk_boundaries_do_not_lose_or_double_matches(chunk_size):
+    matcher = KeywordMatcher(KEYWORDS)
+    expected = text_hits(matcher, TEXT).counts
+    assert stream_hits(matcher, TEXT.encode('utf-8'), chunk_size).counts == expected
+
+
+@pytest.mark.parametrize('chunk_size', [7, 64, 1000])
+def test_chunk_boundaries_in_decoded_path(chunk_size):
+    matcher = KeywordMatcher(KEYWORDS + ['word:акт', 'stem:договоры'], text_folding=True)
+    expected = text_hits(matcher, TEXT).counts
+    assert stream_hits(matcher, TEXT.encode('utf-8'), chunk_size).counts == expected
+
+
+@pytest.mark.parametrize('fuzzy_distance', [0, 1])
+def test_scan_cells_matches_per_cell_scan(fuzzy_distance):
+    cells = ['договор', 'акт', 'до', 'говор', 'догов', 'ор', 'счёт-фактура приложена', '', 'обязуется', 'оплатить',
+             'акты', 'x', 'догвор']
+    matcher = KeywordMatcher(KEYWORDS + ['word:акт'], collect_locations=True, fuzzy_distance=fuzzy_distance,
+                             fuzzy_sources=('excel',))
+    together = FileHits(matcher)
+    together.scan_cells(cells)
+    separately = FileHits(matcher)
+    for cell in cells:
+        separately.scan(cell, source='excel')
+    assert together.counts == separately.counts
+    assert together.counts['договор'] == 1 + fuzzy_distance
+
+
+def test_fuzzy_match_at_start_of_later_cell():
+    matcher = KeywordMatcher(['договорр'], fuzzy_distance=1, fuzzy_sources=('excel',))
+    hits = FileHits(matcher)
+    hits.scan_cells(['x', 'договор'])
+    assert hits.counts == {'договорр': 1}
+
+
+def test_fuzzy_matcher_is_built_on_first_fuzzy_source():
+    matcher = KeywordMatcher(['договор', 'поставка'], fuzzy_distance=1, fuzzy_sources=('ocr',))
+    hits = FileHits(matcher)
+    hits.scan('догавор', source='pdf')
+    assert matcher._fuzzy_matcher is None and not hits
+    hits.scan('догавор', source='ocr')
+    assert matcher._fuzzy_matcher is not None
+    assert hits.counts == {'договор': 1}
+
+
+def test_same_text_in_different_modes_is_counted_separately():
+    matcher = KeywordMatcher(['акт', 'word:акт', 'stem:Акты', 'query:word:акт AND договор', 'договор'])
+    hits = FileHits(matcher)
+    hits.scan('Актив и акт подписаны, договор приложен')
+    hits.finish()
+    assert hits.counts['акт'] == 2
+    assert hits.counts['word:акт'] == 1
+    assert hits.counts['stem:акты'] == 2
+    assert 'query:word:акт AND договор' in hits.found
+    assert matcher.label('word:акт') == 'word:акт'
+    assert matcher.label('stem:акты') == 'stem:Акты'.lower()
+
+
+def test_default_mode_is_not_shown_in_labels():
+    matcher = KeywordMatcher(['Акт', 'sub:договор'], match_mode='word', text_folding=True)
+    hits = FileHits(matcher)
+    hits.scan('акт к договору')
+    assert hits.keyword_summary() == 'акт (1), sub:договор (1)'
+
+
+def test_auto_backend_for_byte_keywords_is_regex():
+    from keyword_matcher import AHO_CORASICK_MIN_KEYWORDS, select_backend
+    keywords = [f'слово{i}'.encode('utf-8') for i in range(AHO_CORASICK_MIN_KEYWORDS)]
+    assert select_backend(keywords).name == 'regex'
+
+
+@pytest.mark.parametrize('text', ['Сче\u0308т № 5 к догово\u0301ру', 'Счёт № 5 к договору'])
+def test_folding_matches_decomposed_letters(text):
+    matcher = KeywordMatcher(['счёт', 'word:договору', 'query:счет AND договор'], text_folding=True,
+                             collect_locations=True)
+    expected = {'счет', 'word:договору', 'query:счет AND договор'}
+    for hits in (text_hits(matcher, text), stream_hits(matcher, text.encode('utf-8'), 8)):
+        hits.finish()
+        assert hits.found == expected
+    cells = FileHits(matcher)
+    cells.scan_cells([text, 'счёт'])
+    assert cells.counts['счет'] == 2
@@ -0,0 +1,58 @@
+import pytest
+
+from keyword_matcher import FileHits, KeywordMatcher
+
+RULE = 'query:контракт AND (поставка OR договор) NOT образец WITHIN 5 words'
+
+
+def query_found(rule, text):
+    hits = FileHits(KeywordMatcher([rule], match_mode='word'))
+    hits.scan(text)
+    hits.finish()
+    return rule in hits.found
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('контракт и поставка', True),
+    ('контракт раз два три четыре пять поставка', False),
+    ('образец контракт поставка', False),
+    ('контракт образец поставка', False),
+    ('контракт поставка образец', False),
+    ('образец раз два три четыре пять контракт поставка', True),
+    ('контракт поставка раз два три четыре пять образец', True),
+    ('образец раз два контракт поставка раз два образец контракт договор раз два три четыре', True),
+])
+def test_not_within_excludes_term_anywhere_in_window(text, expected):
+    assert query_found(RULE, text) is expected
+
+
+def test_not_without_other_terms_in_window():
+    rule = 'query:контракт NOT образец WITHIN 5'
+    assert not query_found(rule, 'контракт образец')
+    assert query_found(rule, 'контракт раз два три четыре пять образец')
+
+
+def test_not_without_within_is_document_level():
+    rule = 'query:контракт NOT образец'
+    assert query_found(rule, 'контракт раз два три четыре пять шесть семь')
+    assert not query_found(rule, 'контракт раз два три четыре пять шесть семь образец')
+
+
+def test_all_mode_stops_once_queries_hold():
+    matcher = KeywordMatcher(['акт', 'query:договор AND поставка'], scan_mode='all')
+    hits = FileHits(matcher)
+    hits.scan('договор поставка акт')
+    assert hits.done
+    hits.scan('акт акт')
+    hits.finish()
+    assert hits.counts == {'акт': 1, 'query:договор AND поставка': 1}
+
+
+def test_all_mode_does_not_stop_on_query_with_not():
+    matcher = KeywordMatcher(['акт', 'query:договор NOT образец'], scan_mode='all')
+    hits = FileHits(matcher)
+    hits.scan('договор акт')
+    assert not hits.done
+    hits.scan('образец')
+    hits.finish()
+    assert hits.found == {'акт'}
@@ -0,0 +1,58 @@
+import os
+import pickle
+
+from keyword_matcher import FileHits
+from matcher_cache import AUTO_CACHE_DIR, cache_key, default_cache_dir, load_cached_matcher
+
+KEYWORDS = ['договор', 'word:акт', 'stem:поставки', 're:\\d{10}']
+OPTIONS = {'match_mode': 'substring', 'fuzzy_distance': 1, 'fuzzy_sources': ('ocr',)}
+
+
+def cached_file(cache_dir):
+    return os.path.join(cache_dir, f"{cache_key(KEYWORDS, OPTIONS)}.pickle")
+
+
+def test_cached_matcher_finds_the_same(tmp_path):
+    built = load_cached_matcher(KEYWORDS, OPTIONS, str(tmp_path))
+    loaded = load_cached_matcher(KEYWORDS, OPTIONS, str(tmp_path))
+    text = 'Договор и акт поставки, ИНН 7701234567, догвор'
+    counts = []
+    for matcher in (built, loaded):
+        hits = FileHits(matcher)
+        hits.scan(text, source='ocr')
+        counts.append(hits.counts)
+    assert counts[0] == counts[1] and counts[0]['договор'] == 2
+
+
+def test_foreign_pickle_is_not_loaded(tmp_path):
+    load_cached_matcher(KEYWORDS, OPTIONS, str(tmp_path))
+    path = cached_file(str(tmp_path))
+    marker = tmp_path / 'unpickled'
+
+    class Payload:
+        def __reduce__(self):
+            return open, (str(marker), 'w')
+
+    with open(path, 'wb') as f:
+        f.write(pickle.dumps(Payload()))
+    assert load_cached_matcher(KEYWORDS, OPTIONS, str(tmp_path)).keywords
+    assert not marker.exists()
+
+
+def test_corrupted_payload_is_rebuilt(tmp_path):
+    load_cached_matcher(KEYWORDS, OPTIONS, str(tmp_path))
+    path = cached_file(str(tmp_path))
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xff]))
+    assert len(load_cached_matcher(KEYWORDS, OPTIONS, str(tmp_path))) == len(KEYWORDS)
+
+
+def test_auto_cache_dir_is_per_user(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    assert default_cache_dir().startswith(str(tmp_path))
+    load_cached_matcher(KEYWORDS, OPTIONS, AUTO_CACHE_DIR)
+    assert os.path.exists(cached_file(default_cache_dir()))
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+pytest.importorskip('tqdm')
+
+from file_discovery import Discovery, SeenFiles
+from keyword_matcher import KeywordMatcher
+from search_engine import search_files, write_late_aliases
+
+
+def test_aliases_from_later_root_are_appended(tmp_path):
+    for root in ('r1', 'r2'):
+        (tmp_path / root).mkdir()
+    (tmp_path / 'r1' / 'a.txt').write_text('договор', encoding='utf-8')
+    try:
+        os.link(tmp_path / 'r1' / 'a.txt', tmp_path / 'r2' / 'a_copy.txt')
+    except OSError:
+        pytest.skip('жёсткие ссылки не поддерживаются')
+    roots = [str(tmp_path / 'r1'), str(tmp_path / 'r2')]
+    output_file = str(tmp_path / 'report.txt')
+    matcher = KeywordMatcher(['договор'])
+    seen = SeenFiles(roots)
+    reported = {}
+    for root in roots:
+        search_files(root, ['*.txt'], 1, output_file, 10, {}, matcher=matcher,
+                     discovery=Discovery(root, ['*.txt'], 10, {}, seen), reported_aliases=reported)
+    assert 'Другие пути' not in open(output_file, encoding='utf-8').read()
+
+    late = write_late_aliases(output_file, reported, seen)
+    assert late == [(roots[0] + os.sep + 'a.txt', [roots[1] + os.sep + 'a_copy.txt'])]
+    report = open(output_file, encoding='utf-8').read()
+    assert report.count(f"Другие пути: {roots[1] + os.sep + 'a_copy.txt'}") == 1
+    assert write_late_aliases(output_file, reported, seen) == []
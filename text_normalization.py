@@ -0,0 +1,59 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Латинские буквы, которые в документах подмешиваются в русские слова вместо похожих кириллических
+HOMOGLYPHS = dict(zip('aeopcxykmtbh', 'аеорсхукмтвн'))
+
+# Буквы, которые при сравнении считаются одинаковыми
+LETTER_FOLDING = {'ё': 'е'}
+
+# Комбинируемые знаки: диакритика в разложенном виде ("е" + U+0308), знаки ударения
+COMBINING_RE = re.compile('[\u0300-\u036f\u0483-\u0489\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+
+
+def _fold_char(ch: str) -> str:
+    """Сравниваемый вид одного символа или он сам, если замена изменила бы длину текста"""
+    folded = unicodedata.normalize('NFKC', ch).casefold()
+    if len(folded) != 1:
+        # "ß" -> "ss", лигатуры и т.п.: места совпадений сдвинулись бы, оставляем только нижний регистр
+        lower = ch.lower()
+        return lower if len(lower) == 1 else ch
+    folded = LETTER_FOLDING.get(folded, folded)
+    return HOMOGLYPHS.get(folded, folded)
+
+
+@lru_cache(maxsize=1)
+def fold_table() -> str:
+    """Таблица для str.translate по всем символам BMP: символ с кодом i заменяется на fold_table()[i].
+
+    Строка, а не словарь: str.translate обращается к ней по индексу, это
+    заметно быстрее поиска в словаре. Символы вне BMP остаются как есть.
+    Собирается один раз на процесс при первом обращении.
+    """
+    return ''.join(ch if 0xD800 <= code < 0xE000 else _fold_char(ch)
+                   for code, ch in ((code, chr(code)) for code in range(0x10000)))
+
+
+def compose(text: str) -> str:
+    """Текст без комбинируемых знаков.
+
+    Буква со знаком собирается в один символ (NFC: "е" + U+0308 -> "ё"),
+    знаки без составной буквы (ударения в русском тексте) удаляются. Длина
+    текста при этом меняется, поэтому это делается над самим текстом до
+    поиска, а не в fold. Текст без таких знаков возвращается как есть.
+    """
+    if not COMBINING_RE.search(text):
+        return text
+    return COMBINING_RE.sub('', unicodedata.normalize('NFC', text))
+
+
+def fold(text: str) -> str:
+    """Приведение текста к сравниваемому виду за один проход.
+
+    NFKC (полноширинные буквы, лигатуры из одного символа и т.п.), нижний
+    регистр, ё -> е и латинские двойники кириллических букв -> кириллица.
+    Длина текста не меняется, поэтому позиции совпадений в приведённом
+    тексте совпадают с позициями в исходном.
+    """
+    return text.translate(fold_table())
@@ -0,0 +1,174 @@
+import codecs
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from morphology import stem
+
+# Слово - последовательность букв (в том числе кириллицы), цифр и подчёркиваний
+WORD_RE = re.compile(r'\w+')
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+# Приведение слова к сравниваемому виду в каждом режиме поиска по словам
+NORMALIZERS: Dict[str, Callable[[str], str]] = {'word': str, 'stem': stem}
+
+
+class _WordTable:
+    """Ключевые слова одного режима: нормализованное слово -> ключи, первое слово фразы -> фразы"""
+    __slots__ = ('normalize', 'single', 'phrases')
+
+    def __init__(self, normalize: Callable[[str], str]):
+        self.normalize = normalize
+        self.single: Dict[str, Tuple[str, ...]] = {}
+        self.phrases: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+
+
+class TokenMatcher:
+    """Поиск ключевых слов по словам текста, а не по подстрокам.
+
+    Каждое слово текста и ключевых слов приводится к сравниваемому виду
+    своего режима: 'word' - слово целиком, 'stem' - основа слова. Однословные
+    ключи ищутся в словаре за одно обращение на слово, а фразы из нескольких
+    слов проверяются только там, где совпало первое слово фразы.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]]):
+        """entries - тройки (режим, ключевое слово, метка совпадений)"""
+        single: Dict[str, Dict[str, List[str]]] = {}
+        self._tables: Dict[str, _WordTable] = {}
+        self.max_phrase_words = 1
+        for mode, keyword, label in sorted(set(entries)):
+            table = self._tables.get(mode)
+            if table is None:
+                table = self._tables[mode] = _WordTable(NORMALIZERS[mode])
+            words = tuple(table.normalize(word) for word in WORD_RE.findall(keyword))
+            if not words:
+                continue
+            if len(words) == 1:
+                single.setdefault(mode, {}).setdefault(words[0], []).append(label)
+            else:
+                table.phrases.setdefault(words[0], []).append((words[1:], label))
+                self.max_phrase_words = max(self.max_phrase_words, len(words))
+        for mode, table in self._tables.items():
+            table.single = {word: tuple(labels) for word, labels in single.get(mode, {}).items()}
+
+    @property
+    def name(self) -> str:
+        return ' + '.join(self._tables)
+
+    def iter_spans(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Тройки (начало, конец, ключевое слово) по тексту в нижнем регистре"""
+        matches = WORD_RE.finditer(text)
+        if len(self._tables) == 1 and not any(table.phrases for table in self._tables.values()):
+            # Частый случай - один режим без фраз: слова не нужно складывать в список
+            table = next(iter(self._tables.values()))
+            normalize, single = table.normalize, table.single
+            for match in matches:
+                labels = single.get(normalize(match.group()))
+                if labels:
+                    for label in labels:
+                        yield match.start(), match.end(), label
+            return
+
+        matches = [(m.start(), m.end(), m.group()) for m in matches]
+        for table in self._tables.values():
+            normalize, single, phrases = table.normalize, table.single, table.phrases
+            tokens = [(start, end, normalize(word)) for start, end, word in matches]
+            for i, (start, end, word) in enumerate(tokens):
+                for label in single.get(word, ()):
+                    yield start, end, label
+                for rest, label in phrases.get(word, ()):
+                    last = i + len(rest)
+                    if last < len(tokens) and all(tokens[i + 1 + j][2] == w for j, w in enumerate(rest)):
+                        yield start, tokens[last][1], label
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        for start, _, label in self.iter_spans(text):
+            yield start, label
+
+    def search(self, text: str) -> Set[str]:
+        if any(table.phrases for table in self._tables.values()):
+            return {label for _, _, label in self.iter_spans(text)}
+        # Без фраз позиции не нужны: достаточно множества различных слов текста
+        found = set()
+        words = set(WORD_RE.findall(text))
+        for table in self._tables.values():
+            normalize, single = table.normalize, table.single
+            if normalize is str:
+                # Целые слова: пересечение множества слов текста с хешированным множеством ключей
+                for word in words & single.keys():
+                    found.update(single[word])
+            else:
+                for word in words:
+                    found.update(single.get(normalize(word), ()))
+        return found
+
+    def first(self, text: str) -> Optional[str]:
+        return next((label for _, _, label in self.iter_spans(text)), None)
+
+    def count(self, text: str) -> Counter:
+        return Counter(label for _, _, label in self.iter_spans(text))
+
+
+# Предел переноса между блоками: текст без единой границы слова режется принудительно
+MAX_CARRY_CHARS = 1024 * 1024
+
+
+class TokenStream:
+    """Поблочное декодирование потока для поиска по словам и шаблонам.
+
+    Окно текста заканчивается на границе слова, а последние context_words
+    слов (и не меньше context_chars символов) переносятся в начало следующего
+    окна: так фразы и шаблоны на границе блоков видны целиком. Совпадение
+    принадлежит окну, если начинается до перенесённой части (owned) - иначе
+    оно будет найдено в следующем окне и не посчитается дважды.
+    """
+
+    def __init__(self, context_words: int, encoding: str, context_chars: int = 0):
+        self._context_words = max(context_words - 1, 0)
+        self._context_chars = context_chars
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._carry = ''
+        # Номер строки, с которой начинается перенесённый хвост
+        self._line = 1
+
+    def _context_start(self, text: str, cut: int) -> int:
+        """Начало перенесённого контекста: context_words полных слов перед cut"""
+        pos = cut
+        for _ in range(self._context_words):
+            while pos > 0 and not _is_word_char(text[pos - 1]):
+                pos -= 1
+            while pos > 0 and _is_word_char(text[pos - 1]):
+                pos -= 1
+        pos = min(pos, cut - self._context_chars)
+        # Перенос не начинается с середины слова: его окончание нашлось бы как отдельное слово
+        while 0 < pos < len(text) and _is_word_char(text[pos - 1]) and _is_word_char(text[pos]):
+            pos -= 1
+        return pos
+
+    def feed(self, data: bytes, final: bool = False) -> Optional[Tuple[str, int, int]]:
+        """Очередное окно: (текст, owned, номер первой строки) или None, если текста пока мало"""
+        text = self._carry + self._decoder.decode(data, final)
+        if final:
+            owned = len(text)
+        else:
+            # Незаконченное слово в конце блока ждёт продолжения
+            cut = len(text)
+            while cut > 0 and _is_word_char(text[cut - 1]):
+                cut -= 1
+            owned = self._context_start(text, cut)
+            if owned <= 0:
+                if len(text) < MAX_CARRY_CHARS:
+                    self._carry = text
+                    return None
+                owned = len(text) - self._context_chars
+        if not text:
+            return None
+        window = (text, owned, self._line)
+        self._line += text.count('\n', 0, owned)
+        self._carry = text[owned:]
+        return window